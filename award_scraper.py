@@ -0,0 +1,154 @@
+import argparse
+import httpx
+import pandas as pd
+from page_cache import PageCache, CachingClient
+from metrics import Metrics
+from table_extract import table_rows, cell_text, cell_link
+import columnar
+
+base_url = "https://www.basketball-reference.com"
+metrics_file = './data/award_metrics.json'
+# cached copies older than a day are refetched
+cache_ttl = 24 * 60 * 60
+# pause after every page that really comes from the site
+request_delay = 3.1
+
+headers = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.google.com/",
+}
+
+# every award page on the site has the same winners table, /awards/<page>.html holds it as
+# table#<page>_NBA (sometimes inside an html comment). another award is one more entry here
+awards = {
+    'mvp': {'award_type': 'MVP', 'output': './scraped/mvp_winners.csv'},
+    'dpoy': {'award_type': 'DPOY', 'output': './scraped/basketball_dpoy.csv'},
+    'roy': {'award_type': 'ROY', 'output': './scraped/roy_winners.csv'},
+    'smoy': {'award_type': 'SMOY', 'output': './scraped/smoy_winners.csv'},
+    'mip': {'award_type': 'MIP', 'output': './scraped/mip_winners.csv'},
+}
+
+# output column -> (data-stat of the cell, conversion)
+stat_columns = {
+    'player_age': ('age', 'int'),
+    'team': ('team_id', 'str'),
+    'games': ('g', 'int'),
+    'minutes_per_game': ('mp_per_g', 'float'),
+    'points_per_game': ('pts_per_g', 'float'),
+    'total_rebounds_per_game': ('trb_per_g', 'float'),
+    'assists_per_game': ('ast_per_g', 'float'),
+    'steals_per_game': ('stl_per_g', 'float'),
+    'blocks_per_game': ('blk_per_g', 'float'),
+    'pct_field_goals': ('fg_pct', 'float'),
+    'pct_threeP_field_goals': ('fg3_pct', 'float'),
+    'pct_ft_field_goals': ('ft_pct', 'float'),
+    'win_shares': ('ws', 'float'),
+    'win_shares_48': ('ws_per_48', 'float'),
+}
+award_columns = ['award_type', 'player_id', 'season', *stat_columns]
+
+
+def to_float(value):
+    if not value:
+        return None
+    if value.startswith('.'):
+        value = '0' + value
+    return float(value)
+
+
+def to_int(value):
+    if not value:
+        return None
+    return int(value)
+
+
+converters = {'int': to_int, 'float': to_float, 'str': lambda value: value or None}
+
+
+def award_url(award):
+    return f'{base_url}/awards/{award}.html'
+
+
+def parse_award_row(cells, award_type):
+    # one typed record per row; a row that can't be read raises ValueError
+    season = cell_text(cells['season']).strip() if 'season' in cells else ''
+    link = cell_link(cells.get('player'))
+    href = link.get('href') if link is not None else ''
+    if '/players/' not in href:
+        raise ValueError(f'no player link in the {season or "unknown"} row')
+    record = {
+        'award_type': award_type,
+        'player_id': href.split('/players/')[1].replace('.html', ''),
+        'season': season,
+    }
+    for column, (stat, kind) in stat_columns.items():
+        cell = cells.get(stat)
+        try:
+            record[column] = converters[kind](cell_text(cell).strip() if cell is not None else '')
+        except ValueError:
+            raise ValueError(f'bad {stat} value {cell_text(cell).strip()!r} in the {season} row')
+    return record
+
+
+def parse_award_table(text, award, metrics=None):
+    # the whole table in one pass. a malformed row is reported (and counted in `metrics`)
+    # and skipped, the rest of the table is still read
+    award_type = awards[award]['award_type']
+    records = []
+    skipped = 0
+    # the header is repeated every few rows in the body as a "thead" row
+    for cells in table_rows(text, f'{award}_NBA', skip_classes=('thead',)):
+        if 'season' not in cells and 'player' not in cells:
+            continue
+        try:
+            records.append(parse_award_row(cells, award_type))
+        except ValueError as e:
+            skipped += 1
+            if metrics is not None:
+                metrics.inc('extract_failures_total', field=award)
+            print(f'{award}: skipping row, {e}')
+    if skipped:
+        print(f'{award}: {skipped} bad rows skipped, {len(records)} read')
+    return records
+
+
+def scrape_award(client, award):
+    response = client.get(award_url(award))
+    response.raise_for_status()
+    with client.metrics.timer('stage_seconds', stage='parse'):
+        return parse_award_table(response.text, award, client.metrics)
+
+
+def save_to_csv(data, filename, output='csv'):
+    df = pd.DataFrame(data, columns=award_columns)
+    # a missing age or games count must not turn the whole column into floats
+    df = df.astype({column: 'Int64' for column, (_, kind) in stat_columns.items() if kind == 'int'})
+    if output == 'csv':
+        df.to_csv(filename, index=False, encoding='utf-8')
+    else:
+        filename = columnar.write(df, 'awards', filename, output)
+    print(f'{filename} successfully saved!')
+
+
+def main(selected=('mvp', 'dpoy'), output='csv'):
+    metrics = Metrics()
+    with httpx.Client(headers=headers) as http_client:
+        client = CachingClient(http_client, PageCache(ttl=cache_ttl), delay=request_delay, metrics=metrics)
+        for award in selected:
+            try:
+                data = scrape_award(client, award)
+                with metrics.timer('stage_seconds', stage='save'):
+                    save_to_csv(data, awards[award]['output'], output)
+            except Exception as e:
+                metrics.inc('errors_total', stage=award)
+                print(f"An error occurred for {award}: {e}")
+    metrics.dump(metrics_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('awards', nargs='*', choices=sorted(awards), default=['mvp', 'dpoy'])
+    parser.add_argument('--output', choices=['csv', *columnar.extensions], default='csv')
+    args = parser.parse_args()
+    main(args.awards, args.output)
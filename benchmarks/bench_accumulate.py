@@ -0,0 +1,82 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scrape_players import PlayerScraper
+from page_cache import PageCache
+from benchmarks import synthetic
+
+# accumulation cost of players/salaries over a batch: the old one-row DataFrame + pandas.concat
+# per player against the row buffers PlayerScraper keeps now. rows come from a pool of parsed
+# synthetic pages, so only the accumulation differs between the two runs
+
+
+def extracted_pages(scraper, pool):
+    # what PlayerScraper._parse_page gives for each page, players row and salary rows
+    return [scraper._parse_page(player_id, synthetic.player_page(player_id))[:2]
+            for player_id in synthetic.player_ids(pool, seed=1)]
+
+
+def before(columns, pages, n):
+    df_players = pandas.DataFrame(columns=columns)
+    df_salaries = pandas.DataFrame(columns=['player_id', 'season', 'salary'])
+    for i in range(n):
+        row, salaries = pages[i % len(pages)]
+        if salaries:
+            df = pandas.DataFrame(salaries, columns=['player_id', 'season', 'salary'])
+            df_salaries = df if len(df_salaries) == 0 else pandas.concat([df_salaries, df], ignore_index=True)
+        player = pandas.DataFrame([row], columns=columns)
+        df_players = pandas.concat([df_players, player], ignore_index=True) if len(df_players) else player
+    return df_players, df_salaries
+
+
+def after(scraper, pages, n):
+    for i in range(n):
+        row, salaries = pages[i % len(pages)]
+        scraper._add_record({'id': row[0], 'player': row, 'salaries': salaries})
+    return scraper.players_data(), scraper.salaries()
+
+
+def measure(fn, make_first, pages, n):
+    # timed and traced in separate runs, tracemalloc slows pandas down by an order of magnitude
+    start = time.perf_counter()
+    players, salaries = fn(make_first(), pages, n)
+    elapsed = time.perf_counter() - start
+    del players, salaries
+    tracemalloc.start()
+    fn(make_first(), pages, n)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_500, 15_000, 150_000])
+    parser.add_argument('--before-max', type=int, default=1_500,
+                        help='skip the concat version above this size, it is quadratic (15k takes ~15 minutes)')
+    parser.add_argument('--pool', type=int, default=200)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    cache = PageCache(os.path.join(cache_dir, 'pages.sqlite'))
+    base = PlayerScraper(verbose=False, cache_dir=cache_dir, cache=cache)
+    pages = extracted_pages(base, args.pool)
+    print(f'{"pages":>8} {"variant":>8} {"time (s)":>10} {"peak (MB)":>10}')
+    for n in args.sizes:
+        variants = [('after', after, lambda: PlayerScraper(verbose=False, cache_dir=cache_dir, cache=cache))]
+        if n <= args.before_max:
+            variants.insert(0, ('before', before, lambda: base.columns))
+        for name, fn, make_first in variants:
+            elapsed, peak = measure(fn, make_first, pages, n)
+            print(f'{n:>8} {name:>8} {elapsed:>10.3f} {peak / 2**20:>10.1f}', flush=True)
+    cache.close()
+    shutil.rmtree(cache_dir)
@@ -0,0 +1,73 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from award_scraper import parse_award_table
+from table_extract import table_html
+from benchmarks import synthetic
+
+# award table parsing: the old per-row/per-column regex parser of mvp_scraper.py, given the
+# table markup only (what the browser used to hand it), against parse_award_table on the
+# whole page. the fixture is a voting table with every candidate of every season
+
+
+def legacy_records(html_content):
+    rows_regex = r'<tr data-row=\"\d+\">.*?</tr>'
+    rows = re.findall(rows_regex, html_content)
+
+    records = []
+    for row in rows:
+        column_regex = r'<td.*?</td>'
+        column_names_regex = r'(?<=data-stat=\")\w+?(?=\")'
+        columns = re.findall(column_regex, row)
+        column_names = re.findall(column_names_regex, row)
+        try:
+            season = re.findall(r'<a[^>]*>(\d{4}-\d{2})</a>', row)[0]
+            player_id = re.findall(
+                r'(?<=a href=\"/players/).+?(?=.html)', columns[1])[0]
+            age = re.findall(r'(\d*\.?\d+)?(?=</td>)', columns[3])[0]
+            Tm = re.findall(r'\w+?(?=</a></td>)', columns[4])[0]
+            other_numeric_values = [re.findall(
+                r'(\d*\.?\d+)?(?=</td>)', col)[0] for col in columns[5:]]
+            records.append([season, player_id, age, Tm, *other_numeric_values])
+        except Exception as e:
+            print(f"Error extracting record data: {e}")
+            return None
+    return records
+
+
+def timed(fn, arg, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candidates', type=int, default=40, help='voting rows per season')
+    parser.add_argument('--padding', type=int, default=1000, help='filler blocks on the page, ~100 bytes each')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    page = synthetic.award_page('mvp', padding=args.padding, candidates=args.candidates)
+    table = table_html(page, 'mvp_NBA')
+    old, old_records = timed(legacy_records, table, args.repeat)
+    new, new_records = timed(lambda text: parse_award_table(text, 'mvp'), page, args.repeat)
+    print(f'{len(new_records)} rows, {len(page) / 2**20:.1f} MB page, {len(table) / 2**20:.1f} MB table')
+    print(f'regex per row and column  {old:8.4f}s')
+    print(f'lxml single pass          {new:8.4f}s  ({old / new:.1f}x)')
+    same = [(r[0], r[1]) for r in old_records] == [(r['season'], r['player_id']) for r in new_records]
+    print(f'same rows: {same}')
+
+    # one malformed row: the regex parser gives up on the whole table, the new one skips the row
+    broken = page.replace('<a href="/players/', '<a href="/player/', 1)
+    print(f'\nwith one broken row: regex parser -> {legacy_records(table_html(broken, "mvp_NBA")) and "rows"}, '
+          f'new parser -> {len(parse_award_table(broken, "mvp"))} rows')
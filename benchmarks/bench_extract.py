@@ -0,0 +1,86 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from lxml import html
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scrape_players import PlayerScraper
+from page_cache import PageCache
+from benchmarks import synthetic
+
+# per-field extraction timings over the cached pages, against the old document-wide xpaths.
+# uses ./data/players, or the player pages of ./data/pages.sqlite once the scraper has moved
+# them there, otherwise synthetic pages
+
+LEGACY_XPATHS = {
+    'name':  '//h1',
+    'pos':   '//p[contains(., "Position:")]',
+    'birthday': '//*[@data-birth]',
+    'death': '//*[@data-death]',
+    'hw': '//p[contains(., "cm,")]',
+    'career': '//p[contains(., "Career Length:")]',
+    'experience': '//p[contains(., "Experience:")]',
+    'hall_of_fame': '//li[@class="important special"]',
+    'all_star': '//li[@class="all_star"]',
+    'stats': '//span/following-sibling::p/following-sibling::p'
+}
+
+
+def load_pages(directory, limit, pack='./data/pages.sqlite'):
+    # the old one-file-per-player cache, or the pack file its pages are moved into.
+    # returns where the pages came from and the (player_id, page) pairs
+    pages = []
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory))[:limit]:
+            with open(os.path.join(directory, name), mode='r', encoding='utf-8') as f:
+                pages.append((name.replace('-', '/', 1), f.read()))
+    if pages or not pack or not os.path.exists(pack):
+        return directory, pages
+    cache = PageCache(pack)
+    for url, _ in cache.entries('%/players/%.html')[:limit]:
+        pages.append((url.split('/players/', 1)[1][:-len('.html')], cache.get(url, stale=True)))
+    cache.close()
+    return pack, pages
+
+
+def legacy_queries(trees):
+    timings = dict.fromkeys(LEGACY_XPATHS, 0.0)
+    for tree in trees:
+        for field, xpath in LEGACY_XPATHS.items():
+            start = time.perf_counter()
+            tree.xpath(xpath)
+            timings[field] += time.perf_counter() - start
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--directory', default='./data/players')
+    parser.add_argument('--limit', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, pages = load_pages(args.directory, args.limit)
+        if not pages:
+            directory = os.path.join(tmp, 'players')
+            synthetic.write_cache(directory, synthetic.player_ids(min(args.limit, 500)), padding=300)
+            source, pages = load_pages(directory, args.limit, pack=None)
+        print(f'{len(pages)} pages from {source}\n')
+
+        scraper = PlayerScraper(verbose=False, cache_dir=tmp, cache=PageCache(os.path.join(tmp, 'pages.sqlite')),
+                                checkpoint=None, profile=True)
+        for player_id, data in pages:
+            scraper._process_page(player_id, data)
+        print('single pass extraction')
+        print(scraper.timing_report())
+
+        trees = [html.fromstring(data) for _, data in pages]
+        timings = legacy_queries(trees)
+        print('\nold document-wide xpaths (queries only)')
+        for field, seconds in sorted(timings.items(), key=lambda x: x[1], reverse=True):
+            print(f'{field:<14}{seconds:>10.3f}')
+        print(f'{"total":<14}{sum(timings.values()):>10.3f}')
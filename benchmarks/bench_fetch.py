@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scrape_players import PlayerScraper
+from benchmarks import synthetic
+from benchmarks.local_site import serve
+
+# cold-cache run of batch_process against the local stand-in, serial vs. concurrent workers
+# under the same request budget. the stand-in adds `latency` seconds to every response
+
+
+def run(base_url, ids, rate, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        os.mkdir('scraped')
+        try:
+            scraper = PlayerScraper(verbose=False, base_url=base_url, cache_dir='./data/players',
+                                    rate=rate, workers=workers)
+            start = time.perf_counter()
+            scraper.batch_process(ids)
+            elapsed = time.perf_counter() - start
+            return elapsed, len(scraper.players_data()), len(scraper.failures)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=60)
+    parser.add_argument('--rate', type=float, default=20.0, help='requests per second')
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    ids = synthetic.player_ids(args.players)
+    with tempfile.TemporaryDirectory() as site:
+        synthetic.write_cache(site, ids)
+        server, url = serve(site, latency=args.latency)
+        print(f'{args.players} players, {args.rate} req/s budget, {args.latency}s latency per request')
+        for workers in args.workers:
+            elapsed, rows, failures = run(url, ids, args.rate, workers)
+            print(f'workers={workers:<3} {elapsed:8.2f}s  {args.players / elapsed:7.2f} pages/s  '
+                  f'rows={rows} failures={failures}')
+        server.shutdown()
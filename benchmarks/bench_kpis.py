@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'db'))
+
+import db_main
+import kpis
+
+# kpis.compute over the scraped players and salaries repeated `--scale` times (player ids made
+# unique per copy), and writing the result to the kpis table of a scratch database
+
+scraped = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scraped')
+
+
+def scaled(players, salaries, scale):
+    player_parts, salary_parts = [], []
+    for i in range(scale):
+        part = players.copy()
+        part['id'] = part['id'] + f'-{i}'
+        player_parts.append(part)
+        part = salaries.copy()
+        part['player_id'] = part['player_id'] + f'-{i}'
+        salary_parts.append(part)
+    return pd.concat(player_parts, ignore_index=True), pd.concat(salary_parts, ignore_index=True)
+
+
+def best_of(repeat, fn, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(scraped))
+    players, salaries = kpis.read_inputs()
+    for scale in sorted({1, args.scale}):
+        scaled_players, scaled_salaries = scaled(players, salaries, scale)
+        seconds, result = best_of(args.repeat, kpis.compute, scaled_players, scaled_salaries)
+        print(f'{scale:>4}x  {len(scaled_players):>8} players {len(scaled_salaries):>8} salaries  '
+              f'compute {seconds:6.3f}s  -> {len(result)} kpi rows')
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f'sqlite:///{os.path.join(tmp, "kpis.db")}')
+        start = time.perf_counter()
+        db_main.bulk_load(engine, {'kpis': result})
+        print(f'{args.scale:>4}x  written to kpis in {time.perf_counter() - start:.3f}s')
+        engine.dispose()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'db'))
+
+import db_main
+
+# loading the scraped csvs into sqlite: the old per-csv to_sql(if_exists="replace") against
+# db_main.bulk_load, on the scraped data repeated `--scale` times (player ids made unique per copy)
+
+scraped = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scraped')
+
+
+def scaled_frames(scale):
+    # db_main reads scraped/*.csv relative to the repo root
+    frames = db_main.read_tables()
+    copies = {}
+    for name, df in frames.items():
+        parts = []
+        for i in range(scale):
+            part = df.copy()
+            for column in ['id', 'player_id']:
+                if column in part.columns and (name == 'players' or column == 'player_id'):
+                    part[column] = part[column].astype(str) + f'-{i}'
+            parts.append(part)
+        copies[name] = db_main.dedupe(name, pd.concat(parts, ignore_index=True))
+    return copies
+
+
+def legacy_load(engine, frames):
+    for name, df in frames.items():
+        if name == 'player_evaluations':
+            df.to_sql(name, con=engine, if_exists='append', index=False)
+        else:
+            df.to_sql(name, con=engine, if_exists='replace', index=False)
+
+
+def timed(fn, path, frames):
+    engine = create_engine(f'sqlite:///{path}')
+    start = time.perf_counter()
+    fn(engine, frames)
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=100)
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(scraped))
+    frames = scaled_frames(args.scale)
+    print(f'{sum(len(df) for df in frames.values())} rows over {len(frames)} tables ({args.scale}x)')
+    with tempfile.TemporaryDirectory() as tmp:
+        old = timed(legacy_load, os.path.join(tmp, 'old.db'), frames)
+        new = timed(db_main.bulk_load, os.path.join(tmp, 'new.db'), frames)
+        again = timed(db_main.bulk_load, os.path.join(tmp, 'new.db'), frames)
+        print(f'to_sql per csv            {old:8.2f}s  (no keys, no indexes)')
+        print(f'bulk_load                 {new:8.2f}s  ({old / new:.1f}x, schema and indexes included)')
+        print(f'bulk_load again           {again:8.2f}s')
@@ -0,0 +1,110 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'db'))
+
+import db_main
+from lookups import Lookups
+
+# `--lookups` mixed lookups (players, salary histories, rosters, award winners) against a
+# database loaded from scraped/: pd.read_sql_query on a fresh connection per query, the way
+# the notebooks do it, then on one shared connection, then db/lookups.py with and without its
+# cache. a few hot players get most of the lookups
+
+scraped = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scraped')
+
+
+def workload(path, count, seed=0):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    players = [row[0] for row in conn.execute('SELECT id FROM players')]
+    rosters = conn.execute('SELECT DISTINCT team_id, season FROM roster_data').fetchall()
+    conn.close()
+    hot = players[:len(players) // 20]
+    seasons = [f'{year}-{(year + 1) % 100:02d}' for year in range(1990, 2025)]
+    operations = []
+    for _ in range(count):
+        player = rnd.choice(hot) if rnd.random() < 0.8 else rnd.choice(players)
+        kind = rnd.random()
+        if kind < 0.4:
+            operations.append(('get_player', (player,)))
+        elif kind < 0.7:
+            operations.append(('salary_history', (player,)))
+        elif kind < 0.9:
+            operations.append(('roster', rnd.choice(rosters)))
+        else:
+            operations.append(('award_winners', (rnd.choice(['MVP', 'DPOY']), rnd.sample(seasons, 3))))
+    return operations
+
+
+legacy_sql = {
+    'get_player': 'SELECT * FROM players WHERE id = ?',
+    'salary_history': 'SELECT season, salary FROM salaries WHERE player_id = ? ORDER BY season',
+    'roster': 'SELECT * FROM roster_data WHERE team_id = ? AND season = ?',
+}
+
+
+def read_sql(conn, name, args):
+    if name == 'award_winners':
+        award_type, seasons = args
+        return pd.read_sql_query(f'SELECT * FROM awards WHERE award_type = ? AND season IN ({", ".join("?" for _ in seasons)})',
+                                 conn, params=(award_type, *seasons))
+    return pd.read_sql_query(legacy_sql[name], conn, params=args)
+
+
+def run_read_sql(path, operations, shared):
+    conn = sqlite3.connect(path) if shared else None
+    for name, args in operations:
+        if shared:
+            read_sql(conn, name, args)
+        else:
+            fresh = sqlite3.connect(path)
+            read_sql(fresh, name, args)
+            fresh.close()
+
+
+def run_lookups(lookups, operations):
+    for name, args in operations:
+        getattr(lookups, name)(*args)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(scraped))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'main.db')
+        engine = create_engine(f'sqlite:///{path}')
+        db_main.bulk_load(engine, db_main.read_tables())
+        engine.dispose()
+        operations = workload(path, args.lookups)
+
+        results = [
+            ('read_sql, new connection', timed(run_read_sql, path, operations, False)),
+            ('read_sql, shared', timed(run_read_sql, path, operations, True)),
+        ]
+        uncached = Lookups(path, maxsize=0)
+        results.append(('Lookups, no cache', timed(run_lookups, uncached, operations)))
+        cached = Lookups(path)
+        results.append(('Lookups, lru cache', timed(run_lookups, cached, operations)))
+        base = results[0][1]
+        print(f'{len(operations)} mixed lookups')
+        for label, seconds in results:
+            print(f'{label:<26}{seconds:8.3f}s {seconds / len(operations) * 1e6:9.1f}us/lookup {base / seconds:8.1f}x')
+        print(f'cache: {cached.hits} hits, {cached.misses} misses')
@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scrape_players import PlayerScraper
+from page_cache import PageCache
+from benchmarks import synthetic
+
+# warm-cache batch_process with the serial parser against the process pool. every page is
+# already in the page cache, so the run is bound by parsing; the outputs must be byte-identical
+
+
+def run(ids, cache_path, workdir, processes):
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(workdir, 'scraped'), exist_ok=True)
+    os.chdir(workdir)
+    try:
+        scraper = PlayerScraper(verbose=False, cache=PageCache(cache_path), checkpoint=None, processes=processes)
+        start = time.perf_counter()
+        scraper.batch_process(ids)
+        elapsed = time.perf_counter() - start
+        outputs = []
+        for name in ['players.csv', 'salaries.csv']:
+            with open(os.path.join('scraped', name), mode='rb') as f:
+                outputs.append(f.read())
+        return elapsed, outputs
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--padding', type=int, default=1500, help='filler blocks per page, ~100 bytes each')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    ids = synthetic.player_ids(args.players)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, 'pages.sqlite')
+        cache = PageCache(cache_path)
+        for player_id in ids:
+            cache.put(f'https://www.basketball-reference.com/players/{player_id}.html',
+                      synthetic.player_page(player_id, padding=args.padding))
+        cache.close()
+        print(f'{args.players} cached pages, {os.cpu_count()} cpus')
+
+        serial = None
+        for processes in sorted(set(args.processes)):
+            elapsed, outputs = run(ids, cache_path, os.path.join(tmp, f'run{processes}'), processes)
+            if serial is None:
+                serial = elapsed, outputs
+            print(f'processes={processes:<3} {elapsed:7.2f}s  {args.players / elapsed:8.1f} pages/s  '
+                  f'speedup={serial[0] / elapsed:5.2f}x  identical={outputs == serial[1]}')
@@ -0,0 +1,77 @@
+import argparse
+import gc
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+import pandas
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scrape_players import PlayerScraper
+from record_store import ColumnStore
+from benchmarks.bench_accumulate import extracted_pages
+
+# memory of the buffered player and salary rows: the old list of python lists (boxed floats,
+# pandas.NA sentinels) against the typed column stores. every row is a fresh copy, as a parse
+# worker or a checkpoint would hand it over
+
+
+def fresh_rows(pages, n):
+    blobs = [pickle.dumps(page) for page in pages]
+    for i in range(n):
+        yield pickle.loads(blobs[i % len(blobs)])
+
+
+def lists(scraper, pages, n):
+    players, salaries = [], []
+    for row, rows in fresh_rows(pages, n):
+        players.append(row)
+        salaries.extend(tuple(salary) for salary in rows)
+    return (players, salaries), lambda: (pandas.DataFrame(players, columns=scraper.columns),
+                                         pandas.DataFrame(salaries, columns=scraper.salary_columns))
+
+
+def stores(scraper, pages, n):
+    players = ColumnStore(scraper.columns, scraper.column_kinds)
+    salaries = ColumnStore(scraper.salary_columns, scraper.salary_kinds)
+    for row, rows in fresh_rows(pages, n):
+        players.append(row)
+        salaries.extend(rows)
+    return (players, salaries), lambda: (players.to_pandas(), salaries.to_pandas())
+
+
+def measure(fn, scraper, pages, n):
+    gc.collect()
+    start = time.perf_counter()
+    buffers, frames = fn(scraper, pages, n)
+    frames()
+    elapsed = time.perf_counter() - start
+    del buffers, frames
+    gc.collect()
+    tracemalloc.start()
+    buffers, frames = fn(scraper, pages, n)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    df_players, df_salaries = frames()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, held, peak, len(df_salaries)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--pool', type=int, default=200)
+    args = parser.parse_args()
+
+    scraper = PlayerScraper.parser()
+    pages = extracted_pages(scraper, args.pool)
+    print(f'{args.rows} players')
+    print(f'{"":<14}{"time (s)":>10}{"buffered (MB)":>15}{"to pandas peak (MB)":>21}')
+    for name, fn in [('lists', lists), ('column store', stores)]:
+        elapsed, held, peak, salaries = measure(fn, scraper, pages, args.rows)
+        print(f'{name:<14}{elapsed:>10.2f}{held / 2**20:>15.1f}{peak / 2**20:>21.1f}')
+    print(f'({salaries} salary rows)')
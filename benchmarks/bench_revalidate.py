@@ -0,0 +1,72 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scrape_players import PlayerScraper
+from page_cache import PageCache
+from benchmarks import synthetic
+from benchmarks.local_site import serve
+
+# revalidation run against the local stand-in: a cold scrape fills the cache, a few pages change
+# on the "site", then batch_process runs again with conditional requests. the output has to match
+# a cold scrape of the changed site
+
+
+def scrape(base_url, ids, workdir, cache_path, revalidate=None):
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(workdir, 'scraped'), exist_ok=True)
+    os.chdir(workdir)
+    try:
+        scraper = PlayerScraper(verbose=False, base_url=base_url, cache=PageCache(cache_path),
+                                rate=1000, workers=8, revalidate=revalidate)
+        start = time.perf_counter()
+        scraper.batch_process(ids)
+        elapsed = time.perf_counter() - start
+        with open('./scraped/players.csv', encoding='utf-8') as f:
+            players = f.read()
+        with open('./scraped/salaries.csv', encoding='utf-8') as f:
+            salaries = f.read()
+        return elapsed, players, salaries
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=300)
+    parser.add_argument('--changed', type=int, default=15)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    ids = synthetic.player_ids(args.players)
+    with tempfile.TemporaryDirectory() as tmp:
+        site = os.path.join(tmp, 'site')
+        synthetic.write_cache(site, ids, padding=300)
+        server, url = serve(site, latency=args.latency)
+        handler = server.RequestHandlerClass
+        cache_path = os.path.join(tmp, 'pages.sqlite')
+
+        elapsed, _, _ = scrape(url, ids, os.path.join(tmp, 'cold'), cache_path)
+        print(f'cold scrape            {elapsed:7.2f}s  requests={handler.hits}')
+
+        # some pages change on the site between runs
+        for player_id in random.Random(1).sample(ids, args.changed):
+            with open(os.path.join(site, player_id.replace('/', '-')), mode='w', encoding='utf-8') as f:
+                f.write(synthetic.player_page(player_id, seed=f'{player_id} changed', padding=300))
+
+        for mode in ['all', 'active']:
+            handler.hits = handler.not_modified = 0
+            elapsed, players, salaries = scrape(url, ids, os.path.join(tmp, mode), cache_path, mode)
+            print(f'revalidate={mode:<7}     {elapsed:7.2f}s  requests={handler.hits} '
+                  f'not_modified={handler.not_modified} downloaded={handler.hits - handler.not_modified}')
+
+        _, fresh_players, fresh_salaries = scrape(url, ids, os.path.join(tmp, 'fresh'),
+                                                  os.path.join(tmp, 'fresh.sqlite'))
+        print(f'matches a cold scrape of the changed site: '
+              f'{players == fresh_players and salaries == fresh_salaries}')
+        server.shutdown()
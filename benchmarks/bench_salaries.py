@@ -0,0 +1,55 @@
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scrape_players import PlayerScraper
+from page_cache import PageCache
+from benchmarks import synthetic
+from benchmarks.bench_extract import load_pages
+
+# salary extraction over the cached pages: the old full-document regex against the compiled
+# pattern run over the salary table only. uses ./data/players or ./data/pages.sqlite when
+# they have pages
+
+LEGACY_PATTERN = r'<th scope="row" class="left " data-stat="season"\s\>(\d{4}-\d{2})<\/th><td class="left " data-stat="team_name" >.*data-stat="salary" csk="(\d+)'
+
+
+def timed(fn, pages, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [fn(data) for _, data in pages]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--directory', default='./data/players')
+    parser.add_argument('--limit', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, pages = load_pages(args.directory, args.limit)
+        if not pages:
+            directory = os.path.join(tmp, 'players')
+            ids = synthetic.player_ids(min(args.limit, 500)) + ['k/krejcvi01']
+            synthetic.write_cache(directory, ids, padding=3000)
+            source, pages = load_pages(directory, args.limit, pack=None)
+        size = sum(len(data) for _, data in pages)
+        print(f'{len(pages)} pages from {source}, {size / 2**20:.1f} MB of html')
+
+        scraper = PlayerScraper(verbose=False, cache_dir=tmp, cache=PageCache(os.path.join(tmp, 'pages.sqlite')),
+                                checkpoint=None)
+        old, old_pairs = timed(lambda data: re.findall(LEGACY_PATTERN, data), pages, args.repeat)
+        new, new_pairs = timed(scraper._salary_pairs, pages, args.repeat)
+        print(f'full document regex   {old:8.4f}s')
+        print(f'salary table slice    {new:8.4f}s  ({old / new:.1f}x)')
+        print(f'identical pairs: {old_pairs == new_pairs} ({sum(len(p) for p in new_pairs)} rows)')
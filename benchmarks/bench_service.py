@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'db'))
+
+import db_main
+
+# load test for db/service.py: `--clients` concurrent keep-alive clients send `--requests`
+# mixed requests (filtered pages of salaries and rosters, the next page through the cursor,
+# players by id, conditional requests with a known etag, a few streamed results) and the
+# p50/p99 latency, requests per second and statuses are printed. the service is started on a
+# database loaded from scraped/, or `--url` points at one that is already running
+
+scraped = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scraped')
+service = os.path.join(os.path.dirname(scraped), 'db', 'service.py')
+
+
+def workload(path, count, seed=0):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    players = [row[0] for row in conn.execute('SELECT id FROM players')]
+    rosters = conn.execute('SELECT DISTINCT team_id, season_start FROM roster_data WHERE team_id IS NOT NULL').fetchall()
+    conn.close()
+    hot = players[:len(players) // 20]
+    requests = []
+    for _ in range(count):
+        player = rnd.choice(hot) if rnd.random() < 0.8 else rnd.choice(players)
+        kind = rnd.random()
+        if kind < 0.3:
+            requests.append(('/salaries', {'player_id': player, 'limit': 10}, False))
+        elif kind < 0.55:
+            team_id, season_start = rnd.choice(rosters)
+            requests.append(('/roster_data', {'team_id': team_id, 'season_start': season_start}, False))
+        elif kind < 0.7:
+            requests.append((f'/players/{player}', {}, False))
+        elif kind < 0.8:
+            requests.append(('/players', {'limit': 50}, 'next'))
+        elif kind < 0.98:
+            requests.append(('/salaries', {'player_id': player, 'limit': 10}, 'etag'))
+        else:
+            requests.append(('/awards', {'award_type': rnd.choice(['MVP', 'DPOY']), 'stream': 1}, False))
+    return requests
+
+
+async def client(url, queue, latencies, statuses, etags):
+    # one keep-alive connection per client, a pool shared by all of them costs more than the service
+    async with httpx.AsyncClient(base_url=url, timeout=30) as http:
+        while not queue.empty():
+            await request(http, queue.get_nowait(), latencies, statuses, etags)
+
+
+async def request(http, request, latencies, statuses, etags):
+    path, params, follow = request
+    headers = {}
+    key = (path, tuple(sorted(params.items())))
+    if follow == 'etag' and key in etags:
+        headers['If-None-Match'] = etags[key]
+    start = time.perf_counter()
+    response = await http.get(path, params=params, headers=headers)
+    if follow == 'next' and response.status_code == 200:
+        cursor = response.json()['next']
+        if cursor:
+            response = await http.get(path, params={**params, 'cursor': cursor})
+    latencies.append(time.perf_counter() - start)
+    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    if 'etag' in response.headers:
+        etags[key] = response.headers['etag']
+
+
+async def run(url, requests, clients):
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies, statuses, etags = [], {}, {}
+    start = time.perf_counter()
+    await asyncio.gather(*[client(url, queue, latencies, statuses, etags) for _ in range(clients)])
+    elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+def served(url):
+    # seconds and requests the service has recorded, summed over routes
+    seconds, count = 0.0, 0
+    for line in httpx.get(f'{url}/metrics').text.splitlines():
+        if line.startswith('service_request_seconds_sum'):
+            seconds += float(line.split()[-1])
+        elif line.startswith('service_request_seconds_count'):
+            count += int(line.split()[-1])
+    return seconds, count
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_service(path, port, workers):
+    process = subprocess.Popen([sys.executable, service, '--db', path, '--port', str(port), '--workers', str(workers)],
+                               stdout=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            httpx.get(url)
+            return process, url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('service did not start')
+
+
+def report(label, url, requests, clients):
+    # client and service share the cpus here, the service's own time per request is printed too
+    seconds, count = served(url)
+    latencies, statuses, elapsed = asyncio.run(run(url, requests, clients))
+    after_seconds, after_count = served(url)
+    print(f'{label}: {len(latencies)} requests in {elapsed:.2f}s, {len(latencies) / elapsed:.0f} req/s, '
+          f'p50 {percentile(latencies, 50) * 1e3:.2f}ms, p99 {percentile(latencies, 99) * 1e3:.2f}ms, '
+          f'in the service {(after_seconds - seconds) / max(after_count - count, 1) * 1e3:.2f}ms/request, '
+          f'statuses {dict(sorted(statuses.items()))}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--url', help='a running service; its database is read from --db for the workload')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(scraped), 'db', 'main.db'))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        if args.url:
+            path, url = args.db, args.url
+        else:
+            os.chdir(os.path.dirname(scraped))
+            path = os.path.join(tmp, 'main.db')
+            engine = create_engine(f'sqlite:///{path}')
+            db_main.bulk_load(engine, db_main.read_tables())
+            engine.dispose()
+            process, url = start_service(path, free_port(), args.workers)
+        try:
+            requests = workload(path, args.requests)
+            # the first pass fills the response cache, the second one mostly hits it
+            report('cold', url, requests, args.clients)
+            report('warm', url, requests, args.clients)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
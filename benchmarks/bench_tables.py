@@ -0,0 +1,123 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from roster_scraper import parse_teams, parse_seasons, parse_roster
+from champion_scraper import parse_champions
+from benchmarks import synthetic
+
+# table parsing of the roster and champion scrapers: the old BeautifulSoup/html.parser code
+# against the shared lxml row extractor, over synthetic team index, franchise, roster and
+# league pages. both sides have to return the same dicts
+
+
+def legacy_teams(text):
+    soup = BeautifulSoup(text, 'html.parser')
+    teams = []
+    for row in soup.find('table', id='teams_active').find_all('tr', class_='full_table'):
+        row_info = row.find('th', {'data-stat': 'franch_name'}).find('a')
+        teams.append({'id': row_info['href'].split('/')[2], 'name': row_info.text, 'href': row_info['href']})
+    return teams
+
+
+def legacy_seasons(text, team_id, start_year=2015):
+    soup = BeautifulSoup(text, 'html.parser')
+    seasons = []
+    for row in soup.find('table', id=team_id).find('tbody').find_all('tr'):
+        season_cell = row.find('th', {'data-stat': 'season'})
+        season = season_cell.get_text()
+        if int(season.split('-')[0]) >= start_year:
+            seasons.append({'season': season, 'href': season_cell.find('a')['href']})
+    return seasons
+
+
+def legacy_roster(text):
+    soup = BeautifulSoup(text, 'html.parser')
+    players = []
+    for row in soup.find('table', id='roster').find('tbody').find_all('tr'):
+        player_info = row.find('td', {'data-stat': 'player'}).find('a')
+        players.append({'id': player_info['href'].split('/players/')[1].replace('.html', ''),
+                        'position': row.find('td', {'data-stat': 'pos'}).text})
+    return players
+
+
+def legacy_champions(text):
+    soup = BeautifulSoup(text, 'html.parser')
+    champions = []
+    for row in soup.find('table', id='stats').find_all('tr'):
+        if row.find_parent('thead'):
+            continue
+        season_cell = row.find('th', {'data-stat': 'season'})
+        champion_cell = row.find('td', {'data-stat': 'champion'})
+        if season_cell and champion_cell:
+            link = champion_cell.find('a')
+            if link:
+                champions.append({'Season': season_cell.get_text(strip=True), 'Champion': link.get_text(strip=True),
+                                  'Team_ID': link.get('href').split('/')[2]})
+    return champions
+
+
+def run(jobs):
+    return [fn(*args) for fn, args in jobs]
+
+
+def timed(jobs, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = run(jobs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def peak_memory(jobs):
+    # one page at a time, as the scrapers see them
+    peak = 0
+    for job in jobs:
+        tracemalloc.start()
+        run([job])
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rosters', type=int, default=60)
+    parser.add_argument('--padding', type=int, default=2000, help='filler blocks per page, ~100 bytes each')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = {'teams': synthetic.teams_page(padding=args.padding),
+             'leagues': synthetic.leagues_page(padding=args.padding)}
+    for team in synthetic.TEAMS:
+        pages[team] = synthetic.team_page(team, padding=args.padding)
+    rosters = [(synthetic.TEAMS[i % len(synthetic.TEAMS)], 2025 - i // len(synthetic.TEAMS)) for i in range(args.rosters)]
+    for team, year in rosters:
+        pages[team, year] = synthetic.roster_page(team, year, padding=args.padding)
+    size = sum(len(text) for text in pages.values())
+    print(f'{len(pages)} pages, {size / 2**20:.1f} MB of html\n')
+
+    def jobs(teams, seasons, roster, champions):
+        return ([(teams, (pages['teams'],)), (champions, (pages['leagues'],))]
+                + [(seasons, (pages[team], team)) for team in synthetic.TEAMS]
+                + [(roster, (pages[key],)) for key in rosters])
+
+    old_jobs = jobs(legacy_teams, legacy_seasons, legacy_roster, legacy_champions)
+    new_jobs = jobs(parse_teams, parse_seasons, parse_roster, parse_champions)
+    old, old_results = timed(old_jobs, args.repeat)
+    new, new_results = timed(new_jobs, args.repeat)
+    old_peak = peak_memory(old_jobs)
+    new_peak = peak_memory(new_jobs)
+    print(f'{"":<26}{"time":>10}{"peak memory":>16}')
+    print(f'{"BeautifulSoup html.parser":<26}{old:>9.3f}s{old_peak / 2**20:>13.1f} MB')
+    print(f'{"lxml table rows":<26}{new:>9.3f}s{new_peak / 2**20:>13.1f} MB')
+    print(f'\n{old / new:.1f}x faster, {old_peak / new_peak:.1f}x less memory per page')
+    print(f'identical output: {old_results == new_results}')
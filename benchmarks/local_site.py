@@ -0,0 +1,109 @@
+import argparse
+import email.utils
+import hashlib
+import os
+import threading
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from page_cache import PageCache
+
+# a local stand-in for basketball-reference that serves the cached player pages
+# (./data/players/b-bryanko01 is served as /players/b/bryanko01.html), and with `pack` the
+# player pages of a PageCache pack file, where the scraper moves that directory's pages.
+# it sends ETag and Last-Modified headers and answers conditional requests with 304
+
+
+class Handler(BaseHTTPRequestHandler):
+    directory = './data/players'
+    pack = None
+    # path -> (url, fetched) of the pack's player pages
+    pack_pages = {}
+    latency = 0.0
+    hits = 0
+    not_modified = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        type(self).hits += 1
+        if self.latency:
+            time.sleep(self.latency)
+        path = self.path.split('?')[0]
+        if not path.startswith('/players/') or not path.endswith('.html'):
+            self.send_error(404)
+            return
+        name = path[len('/players/'):-len('.html')].replace('/', '-')
+        fp = os.path.join(self.directory, name)
+        if os.path.isfile(fp):
+            with open(fp, mode='rb') as f:
+                body = f.read()
+            modified = int(os.path.getmtime(fp))
+        elif path in self.pack_pages:
+            url, fetched = self.pack_pages[path]
+            body = self.pack.get(url, stale=True).encode('utf-8')
+            modified = int(fetched)
+        else:
+            self.send_error(404)
+            return
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self._not_modified(etag, modified):
+            type(self).not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(modified, usegmt=True))
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_modified(self, etag, modified):
+        # If-None-Match wins over If-Modified-Since, like on a real server
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')]
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                return modified <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+def serve(directory='./data/players', port=0, latency=0.0, pack=None):
+    # starts the stand-in on a background thread; returns the server and its base url
+    cache, pack_pages = None, {}
+    if pack and os.path.exists(pack):
+        cache = PageCache(pack)
+        pack_pages = {'/players/' + url.split('/players/', 1)[1]: (url, fetched)
+                      for url, fetched in cache.entries('%/players/%.html')}
+    handler = type('CacheHandler', (Handler,),
+                   {'directory': directory, 'pack': cache, 'pack_pages': pack_pages, 'latency': latency,
+                    'hits': 0, 'not_modified': 0})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--directory', default='./data/players')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--pack', default='./data/pages.sqlite')
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    server, url = serve(args.directory, args.port, args.latency, args.pack)
+    print(f'serving {args.directory} and {args.pack} on {url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,312 @@
+import os
+import random
+
+# builds fake player pages with the same markup as basketball-reference player pages,
+# so the scrapers can be benchmarked without hitting the site
+
+FIRST = ['James', 'Kevin', 'Luka', 'Nikola', 'Vince', 'Rudy', 'Evan', 'Anthony', 'Chris', 'Paul']
+LAST = ['Walker', 'Brown', 'Green', 'Young', 'Adams', 'Carter', 'Hill', 'Lopez', 'Mills', 'Reed']
+POSITIONS = ['Point Guard', 'Shooting Guard', 'Small Forward', 'Power Forward', 'Center',
+             'Shooting Guard and Small Forward', 'Power Forward and Center']
+TEAMS = ['ATL', 'BOS', 'BRK', 'CHI', 'CLE', 'DAL', 'DEN', 'GSW', 'LAL', 'MIA', 'OKC', 'SAS']
+
+
+def player_ids(n, seed=0):
+    rnd = random.Random(seed)
+    ids = []
+    for i in range(n):
+        last = rnd.choice(LAST).lower()
+        first = rnd.choice(FIRST).lower()
+        ids.append(f'{last[0]}/{last[:5]}{first[:2]}{i:05d}')
+    return ids
+
+
+def _salary_rows(rnd, start, seasons, broken):
+    rows = []
+    for i in range(seasons):
+        season = f'{start + i}-{str(start + i + 1)[-2:]}'
+        team = rnd.choice(TEAMS)
+        if broken and i == seasons - 1:
+            # k/krejcvi01 has a salary cell without a csk value
+            salary = '<td class="right " data-stat="salary" >&lt; $Minimum</td>'
+        else:
+            amount = rnd.randint(500_000, 45_000_000)
+            salary = f'<td class="right " data-stat="salary" csk="{amount}" >${amount:,}</td>'
+        rows.append(
+            f'<tr ><th scope="row" class="left " data-stat="season" >{season}</th>'
+            f'<td class="left " data-stat="team_name" ><a href="/teams/{team}/{start + i + 1}.html">{team}</a></td>'
+            f'<td class="left " data-stat="lg_id" ><a href="/leagues/NBA_{start + i + 1}.html">NBA</a></td>'
+            f'{salary}</tr>'
+        )
+    return rows
+
+
+def _season_table(table_id, player_id, start, seasons, stats, rnd, commented):
+    # a per-season table of a player page: a row per season (plus a partial row per team in a
+    # traded season), a repeated header every 10 rows and a career row in the footer
+    head = ''.join(f'<th data-stat="{stat}">{stat}</th>' for stat in ['year_id', 'age', 'team_name_abbr', 'comp_name_abbr', 'pos', *stats])
+    rows = []
+    for i in range(seasons):
+        if i and i % 10 == 0:
+            rows.append(f'<tr class="thead">{head}</tr>')
+        year = start + i
+        traded = rnd.random() < 0.08
+        teams = ['2TM', *rnd.sample(TEAMS, 2)] if traded else [rnd.choice(TEAMS)]
+        for j, team in enumerate(teams):
+            values = ''.join(f'<td class="right " data-stat="{stat}" >{kind(rnd)}</td>' for stat, kind in stats.items())
+            rows.append(f'<tr id="{table_id}.{year + 1}" class="{"partial_table" if j else "full_table"}" >'
+                        f'<th scope="row" class="left " data-stat="year_id" ><a href="/players/{player_id}/gamelog/{year + 1}">'
+                        f'{year}-{str(year + 1)[-2:]}</a></th><td class="center " data-stat="age" >{22 + i}</td>'
+                        f'<td class="left " data-stat="team_name_abbr" ><a href="/teams/{team}/{year + 1}.html">{team}</a></td>'
+                        f'<td class="left " data-stat="comp_name_abbr" >NBA</td><td class="center " data-stat="pos" >SG</td>'
+                        f'{values}</tr>')
+    foot = ''.join(f'<td class="right " data-stat="{stat}" >{kind(rnd)}</td>' for stat, kind in stats.items())
+    table = (f'<table class="stats_table sortable row_summable" id="{table_id}"><thead><tr>{head}</tr></thead>'
+             f'<tbody>{"".join(rows)}</tbody><tfoot><tr><th data-stat="year_id">Career</th>'
+             f'<td data-stat="age"></td><td data-stat="team_name_abbr"></td><td data-stat="comp_name_abbr">NBA</td>'
+             f'<td data-stat="pos"></td>{foot}</tr></tfoot></table>')
+    if commented:
+        table = f'<div class="placeholder"></div>\n<!--\n{table}\n-->\n'
+    return f'<div id="all_{table_id}" class="table_wrapper">{table}</div>'
+
+
+def season_tables(player_id, start, seasons):
+    # per_game is part of the page, totals and advanced only come inside html comments
+    rnd = random.Random(f'{player_id}seasons')
+    count = lambda low, high: lambda r: r.randint(low, high)
+    average = lambda high: lambda r: round(r.uniform(0, high), 1)
+    pct = lambda r: f'.{r.randint(300, 650)}' if r.random() > 0.05 else ''
+    per_game = {'games': count(1, 82), 'games_started': count(0, 82), 'mp_per_g': average(40), 'fg_pct': pct,
+                'fg3_pct': pct, 'trb_per_g': average(15), 'ast_per_g': average(11), 'pts_per_g': average(35),
+                'awards': lambda r: r.choice(['', '', '', 'AS', 'MVP-3,AS'])}
+    totals = {'games': count(1, 82), 'mp': count(10, 3200), 'fg': count(0, 900), 'fga': count(0, 1800),
+              'trb': count(0, 1200), 'ast': count(0, 900), 'pts': count(0, 2800)}
+    advanced = {'games': count(1, 82), 'per': average(35), 'ts_pct': pct, 'usg_pct': average(40),
+                'ws': average(18), 'ws_per_48': pct, 'bpm': average(12), 'vorp': average(9)}
+    return (_season_table('per_game_stats', player_id, start, seasons, per_game, rnd, False)
+            + _season_table('totals_stats', player_id, start, seasons, totals, rnd, True)
+            + _season_table('advanced', player_id, start, seasons, advanced, rnd, True))
+
+
+def player_page(player_id, seed=None, padding=0):
+    rnd = random.Random(seed if seed is not None else player_id)
+    name = f'{rnd.choice(FIRST)} {rnd.choice(LAST)}'
+    kind = rnd.random()
+    start = rnd.randint(1950, 2023)
+    seasons = rnd.randint(1, 20)
+    active = start + seasons >= 2025
+    parts = ['<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>', name,
+             ' Stats | Basketball-Reference.com</title></head><body><div id="wrap">',
+             '<div id="info" class="players"><div id="meta"><div>',
+             f'<h1><span>{name}</span></h1>',
+             f'<p><strong>{name}</strong></p>']
+    if kind > 0.03:
+        parts.append(f'<p>\n  <strong>\n  Position:\n  </strong>\n  {rnd.choice(POSITIONS)}\n\n  '
+                     f'&#9642;\n  \n  <strong>\n  Shoots:\n  </strong>\n  {rnd.choice(["Right", "Left"])}\n</p>')
+    height = rnd.randint(175, 229)
+    weight = rnd.randint(75, 140)
+    parts.append(f'<p><span>6-7</span>,&nbsp;<span>220lb</span>&nbsp;({height}cm,&nbsp;{weight}kg) </p>')
+    born = f'{start - rnd.randint(19, 23)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}'
+    parts.append(f'<p><strong>Born: </strong><span id="necro-birth" data-birth="{born}">'
+                 f'<a href="/friv/birthdays.fcgi">somewhere</a></span></p>')
+    if not active and rnd.random() < 0.3:
+        died = f'{start + seasons + rnd.randint(5, 40)}-01-15'
+        parts.append(f'<p><strong>Died: </strong><span id="necro-death" data-death="{died}">January 15</span></p>')
+    parts.append('<p><strong>College:</strong> <a href="/friv/colleges.fcgi">Somewhere State</a></p>')
+    if active:
+        if kind < 0.06:
+            # rookies have neither a career length nor an experience line (e.g. n/newelas01)
+            pass
+        else:
+            parts.append(f'<p><strong>Experience:</strong> {seasons} year{"s" if seasons > 1 else ""}</p>')
+    else:
+        parts.append(f'<p><strong>Career Length:</strong> {seasons} year{"s" if seasons > 1 else ""}</p>')
+    parts.append('</div></div>')
+    parts.append('<ul id="bling">')
+    if rnd.random() < 0.1:
+        parts.append(f'<li class="all_star"><a href="/allstar/">{rnd.randint(1, 15)}x All Star</a></li>')
+    if rnd.random() < 0.03:
+        parts.append('<li class="important special"><a href="/awards/hof.html">Hall of Fame</a></li>')
+    parts.append('</ul></div>')
+    # stat pullout; d/djurini01 style players have none, r/reedwi01 style ones lack 3P/eFG
+    stats_kind = rnd.random()
+    if stats_kind > 0.05:
+        labels = ['G', 'PTS', 'TRB', 'AST', 'FG%', 'FG3%', 'eFG%', 'FT%', 'PER', 'WS']
+        if stats_kind < 0.2:
+            labels = ['G', 'PTS', 'TRB', 'AST', 'FG%', 'FT%', 'PER', 'WS']
+        parts.append('<div class="stats_pullout"><div><div><span><strong>SUMMARY</strong></span>'
+                     '<p><strong>2024-25</strong></p><p><strong>Career</strong></p></div></div><div class="p1">')
+        for label in labels:
+            value = rnd.randint(1, 1500) if label == 'G' else round(rnd.uniform(0, 60), 1)
+            if label == 'WS' and rnd.random() < 0.02:
+                value = ''
+            parts.append(f'<div><span><strong>{label}</strong></span><p>{value}</p><p>{value}</p></div>')
+        parts.append('</div></div>')
+    parts.append(season_tables(player_id, start, seasons))
+    for i in range(padding):
+        parts.append(f'<div class="filler"><p>filler paragraph {i}</p><span>noise</span></div>')
+    if rnd.random() < 0.9:
+        rows = _salary_rows(rnd, start, seasons, player_id == 'k/krejcvi01' or rnd.random() < 0.01)
+        parts.append('<div id="all_all_salaries" class="table_wrapper"><div class="placeholder"></div>\n<!--\n'
+                     '<table class="suppress_all sortable stats_table" id="all_salaries" data-cols-to-freeze=",1">\n'
+                     '<thead><tr><th data-stat="season">Season</th><th data-stat="team_name">Team</th>'
+                     '<th data-stat="lg_id">Lg</th><th data-stat="salary">Salary</th></tr></thead>\n<tbody>\n')
+        parts.append('\n'.join(rows))
+        parts.append('\n</tbody></table>\n-->\n</div>')
+    parts.append('</div></body></html>')
+    return ''.join(parts)
+
+
+def write_cache(directory, ids, padding=0):
+    os.makedirs(directory, exist_ok=True)
+    for player_id in ids:
+        with open(os.path.join(directory, player_id.replace('/', '-')), mode='w', encoding='utf-8') as f:
+            f.write(player_page(player_id, padding=padding))
+
+
+def _filler(padding):
+    return ''.join(f'<div class="filler"><p>filler paragraph {i}</p><span>noise</span></div>' for i in range(padding))
+
+
+def _page(title, body, padding):
+    # the tables sit between the same kind of navigation and filler the real pages have
+    return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{title}</title></head>'
+            f'<body><div id="wrap"><div id="header">{_filler(padding // 2)}</div>{body}'
+            f'<div id="footer">{_filler(padding - padding // 2)}</div></div></body></html>')
+
+
+def teams_page(teams=TEAMS, padding=0):
+    rows = []
+    for team in teams:
+        rows.append(f'<tr class="full_table"><th scope="row" class="left " data-stat="franch_name">'
+                    f'<a href="/teams/{team}/">{team} Franchise</a></th>'
+                    f'<td class="left " data-stat="lg_id">NBA</td><td class="right " data-stat="year_min">1949-50</td></tr>')
+        # the former names of a franchise follow it as partial rows
+        rows.append(f'<tr class="partial_table"><th scope="row" class="left " data-stat="franch_name">{team} Old Name</th>'
+                    f'<td class="left " data-stat="lg_id">NBA</td><td class="right " data-stat="year_min">1949-50</td></tr>')
+    table = ('<div id="all_teams_active" class="table_wrapper"><table class="stats_table" id="teams_active">'
+             '<thead><tr><th data-stat="franch_name">Franchise</th><th data-stat="lg_id">Lg</th>'
+             '<th data-stat="year_min">From</th></tr></thead><tbody>' + ''.join(rows) + '</tbody></table></div>')
+    return _page('NBA and ABA Franchise Index', table, padding)
+
+
+def team_page(team, last=2025, first=1980, padding=0):
+    rows = []
+    for year in range(last, first - 1, -1):
+        rows.append(f'<tr ><th scope="row" class="left " data-stat="season">'
+                    f'<a href="/teams/{team}/{year + 1}.html">{year}-{str(year + 1)[-2:]}</a></th>'
+                    f'<td class="left " data-stat="lg_id"><a href="/leagues/NBA_{year + 1}.html">NBA</a></td>'
+                    f'<td class="left " data-stat="team_name">{team}</td>'
+                    f'<td class="right " data-stat="wins">{(year * 7) % 60 + 10}</td></tr>')
+    table = (f'<table class="sortable stats_table" id="{team}"><thead><tr><th data-stat="season">Season</th>'
+             '<th data-stat="lg_id">Lg</th><th data-stat="team_name">Team</th><th data-stat="wins">W</th></tr></thead>'
+             '<tbody>' + ''.join(rows) + '</tbody></table>')
+    return _page(f'{team} Franchise Index', table, padding)
+
+
+def roster_page(team, year, padding=0):
+    rnd = random.Random(f'{team}{year}')
+    rows = []
+    for i in range(rnd.randint(13, 18)):
+        last = rnd.choice(LAST)
+        first = rnd.choice(FIRST)
+        player_id = f'{last[0].lower()}/{last[:5].lower()}{first[:2].lower()}{i:02d}'
+        rows.append(f'<tr ><th scope="row" class="center " data-stat="number">{i}</th>'
+                    f'<td class="left " data-append-csv="{player_id[2:]}" data-stat="player">'
+                    f'<a href="/players/{player_id}.html">{first} {last}</a></td>'
+                    f'<td class="center " data-stat="pos">{rnd.choice(["PG", "SG", "SF", "PF", "C"])}</td>'
+                    f'<td class="right " data-stat="height">6-{rnd.randint(0, 11)}</td></tr>')
+    table = ('<div id="all_roster" class="table_wrapper"><table class="sortable stats_table" id="roster">'
+             '<thead><tr><th data-stat="number">No.</th><th data-stat="player">Player</th>'
+             '<th data-stat="pos">Pos</th><th data-stat="height">Ht</th></tr></thead>'
+             '<tbody>' + ''.join(rows) + '</tbody></table></div>')
+    return _page(f'{year}-{str(year + 1)[-2:]} {team} Roster and Stats', table, padding)
+
+
+def leagues_page(last=2025, first=1947, padding=0):
+    rnd = random.Random(last)
+    rows = []
+    for year in range(last, first - 1, -1):
+        team = rnd.choice(TEAMS)
+        rows.append(f'<tr ><th scope="row" class="left " data-stat="season">'
+                    f'<a href="/leagues/NBA_{year + 1}.html">{year}-{str(year + 1)[-2:]}</a></th>'
+                    f'<td class="left " data-stat="lg_id">NBA</td>'
+                    f'<td class="left " data-stat="champion"><a href="/teams/{team}/{year + 1}.html">{team} Champion</a></td>'
+                    f'<td class="left " data-stat="mvp"><a href="/players/x/xx01.html">Somebody</a></td></tr>')
+    table = ('<div id="all_stats" class="table_wrapper"><table class="stats_table" id="stats">'
+             '<thead><tr class="over_header"><th colspan="4"></th></tr><tr><th data-stat="season">Season</th>'
+             '<th data-stat="lg_id">Lg</th><th data-stat="champion">Champion</th><th data-stat="mvp">MVP</th></tr></thead>'
+             '<tbody>' + ''.join(rows) + '</tbody></table></div>')
+    return _page('NBA & ABA League Index', table, padding)
+
+
+def award_page(award='mvp', last=2025, first=1956, padding=0, commented=False, candidates=1):
+    # the winners table of /awards/<award>.html, with the header repeated every 20 rows.
+    # `candidates` rows per season make it a full voting table instead
+    rnd = random.Random(f'{award}{last}')
+    rows = []
+    seasons = [year for year in range(last, first - 1, -1) for _ in range(candidates)]
+    for i, year in enumerate(seasons):
+        if i and i % 20 == 0:
+            rows.append('<tr class="thead"><th data-stat="season">Season</th><td data-stat="lg_id">Lg</td>'
+                        '<td data-stat="player">Player</td></tr>')
+        last_name = rnd.choice(LAST)
+        player_id = f'{last_name[0].lower()}/{last_name[:5].lower()}{rnd.choice(FIRST)[:2].lower()}{i % 100:02d}'
+        stats = {'age': rnd.randint(20, 36), 'team_id': rnd.choice(TEAMS), 'g': rnd.randint(50, 82),
+                 'mp_per_g': round(rnd.uniform(25, 42), 1), 'pts_per_g': round(rnd.uniform(8, 36), 1),
+                 'trb_per_g': round(rnd.uniform(2, 16), 1), 'ast_per_g': round(rnd.uniform(1, 11), 1),
+                 'stl_per_g': round(rnd.uniform(0, 3), 1), 'blk_per_g': round(rnd.uniform(0, 4), 1),
+                 'fg_pct': f'.{rnd.randint(400, 650)}', 'fg3_pct': f'.{rnd.randint(0, 450):03d}' if year > 1979 else '',
+                 'ft_pct': f'.{rnd.randint(500, 950)}', 'ws': round(rnd.uniform(5, 20), 1),
+                 'ws_per_48': f'.{rnd.randint(100, 330)}'}
+        cells = ''.join(f'<td class="right " data-stat="{stat}" >{value}</td>' for stat, value in stats.items()
+                        if stat not in ('age', 'team_id'))
+        rows.append(f'<tr data-row="{len(rows)}"><th scope="row" class="left " data-stat="season" >'
+                    f'<a href="/leagues/NBA_{year + 1}.html">{year}-{str(year + 1)[-2:]}</a></th>'
+                    f'<td class="left " data-stat="lg_id" ><a href="/leagues/NBA_{year + 1}.html">NBA</a></td>'
+                    f'<td class="left " data-append-csv="{player_id[2:]}" data-stat="player" >'
+                    f'<a href="/players/{player_id}.html">{rnd.choice(FIRST)} {last_name}</a></td>'
+                    f'<td class="right " data-stat="voting" ></td>'
+                    f'<td class="right " data-stat="age" >{stats["age"]}</td>'
+                    f'<td class="left " data-stat="team_id" ><a href="/teams/{stats["team_id"]}/{year + 1}.html">{stats["team_id"]}</a></td>'
+                    f'{cells}</tr>')
+    table = (f'<table class="sortable stats_table" id="{award}_NBA"><caption>NBA {award.upper()}</caption>'
+             '<thead><tr><th data-stat="season">Season</th><th data-stat="lg_id">Lg</th>'
+             '<th data-stat="player">Player</th></tr></thead><tbody>' + ''.join(rows) + '</tbody></table>')
+    if commented:
+        table = f'<div class="placeholder"></div>\n<!--\n{table}\n-->\n'
+    return _page(f'NBA {award.upper()} Award Winners', f'<div id="all_{award}_NBA" class="table_wrapper">{table}</div>', padding)
+
+
+def totals_page(year, players=600, padding=0):
+    # /leagues/NBA_<year>_totals.html: players ranked by points, traded players get a combined
+    # row followed by one partial row per team, the header repeats every 20 rows
+    rnd = random.Random(f'totals{year}')
+    points = sorted((rnd.randint(0, 2800) for _ in range(players)), reverse=True)
+    rows = []
+    for rank, pts in enumerate(points, start=1):
+        if rank % 20 == 0:
+            rows.append('<tr class="thead"><th data-stat="ranker">Rk</th><td data-stat="name_display">Player</td></tr>')
+        last = rnd.choice(LAST)
+        player_id = f'{last[0].lower()}/{last[:5].lower()}{rnd.choice(FIRST)[:2].lower()}{rank % 100:02d}'
+        traded = rnd.random() < 0.1
+        teams = rnd.sample(TEAMS, 2) if traded else [rnd.choice(TEAMS)]
+        age = rnd.randint(19, 40)
+        pos = rnd.choice(['PG', 'SG', 'SF', 'PF', 'C'])
+
+        def row(team, cls=''):
+            return (f'<tr class="{cls}"><th scope="row" class="right " data-stat="ranker" >{rank}</th>'
+                    f'<td class="left " data-append-csv="{player_id[2:]}" data-stat="name_display" >'
+                    f'<a href="/players/{player_id}.html">{last}</a></td>'
+                    f'<td class="right " data-stat="age" >{age}</td>'
+                    f'<td class="left " data-stat="team_name_abbr" >{team}</td>'
+                    f'<td class="center " data-stat="pos" >{pos}</td>'
+                    f'<td class="right " data-stat="games" >{rnd.randint(1, 82)}</td>'
+                    f'<td class="right " data-stat="pts" >{pts}</td></tr>')
+        rows.append(row('2TM' if traded else teams[0]))
+        if traded:
+            rows.extend(row(team, 'partial_table') for team in teams)
+    table = ('<table class="sortable stats_table" id="totals_stats"><thead><tr><th data-stat="ranker">Rk</th>'
+             '<th data-stat="name_display">Player</th></tr></thead><tbody>' + ''.join(rows) + '</tbody></table>')
+    return _page(f'{year - 1}-{str(year)[-2:]} NBA Player Stats: Totals',
+                 f'<div id="all_totals_stats" class="table_wrapper">{table}</div>', padding)
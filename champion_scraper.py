@@ -1,10 +1,17 @@
+import argparse
 import httpx
-from bs4 import BeautifulSoup
 import pandas as pd
+from page_cache import PageCache, CachingClient
+from metrics import Metrics
+from table_extract import table_rows, cell_text, cell_link
+import columnar
 
 base_url = "https://www.basketball-reference.com"
 leagues_url = f"{base_url}/leagues/"
 output_file = "./scraped/champions.csv"
+metrics_file = "./data/champion_metrics.json"
+# cached copies older than a day are refetched
+cache_ttl = 24 * 60 * 60
 
 headers = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -12,29 +19,24 @@ headers = {
     "Referer": "https://www.google.com/",
 }
 
-def get_champions_soup(client):
+def get_champions_page(client):
     response = client.get(leagues_url)
     response.raise_for_status()
-    return BeautifulSoup(response.text, "html.parser")
+    return response.text
 
-def parse_champions(soup):
+def parse_champions(text):
     champions_data = []
     
-    table = soup.find("table", id="stats")
-    rows = table.find_all("tr")
-    for row in rows:
-        if row.find_parent("thead"):
-            continue
-            
-        season_cell = row.find("th", {"data-stat": "season"})
-        champion_cell = row.find("td", {"data-stat": "champion"})
+    for cells in table_rows(text, "stats"):
+        season_cell = cells.get("season")
+        champion_cell = cells.get("champion")
         
-        if season_cell and champion_cell:
-            season = season_cell.get_text(strip=True)
-            link = champion_cell.find("a")
+        if season_cell is not None and champion_cell is not None:
+            season = cell_text(season_cell).strip()
+            link = cell_link(champion_cell)
             
-            if link:
-                champion_name = link.get_text(strip=True)
+            if link is not None:
+                champion_name = cell_text(link).strip()
                 href = link.get("href")
                 parts = href.split("/")
                 team_id = parts[2]
@@ -46,20 +48,31 @@ def parse_champions(soup):
                 })
     return champions_data
 
-def save_to_csv(data, filename):
+def save_to_csv(data, filename, output='csv'):
     df = pd.DataFrame(data)
-    df.to_csv(filename, index=False, encoding='utf-8')
+    if output == 'csv':
+        df.to_csv(filename, index=False, encoding='utf-8')
+    else:
+        filename = columnar.write(df, 'champions', filename, output)
     print(f'{filename} successfully saved!')
 
-def main():
-    with httpx.Client(headers=headers) as client:
+def main(output='csv'):
+    metrics = Metrics()
+    with httpx.Client(headers=headers) as http_client:
+        client = CachingClient(http_client, PageCache(ttl=cache_ttl), metrics=metrics)
         try:
-            soup = get_champions_soup(client)
-            data = parse_champions(soup)
+            text = get_champions_page(client)
+            with metrics.timer('stage_seconds', stage='parse'):
+                data = parse_champions(text)
         except Exception as e:
+            metrics.inc('errors_total', stage='champions')
             print(f"An error occurred: {e}")
         finally:
-            save_to_csv(data, output_file)
+            with metrics.timer('stage_seconds', stage='save'):
+                save_to_csv(data, output_file, output)
+    metrics.dump(metrics_file)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', choices=['csv', *columnar.extensions], default='csv')
+    main(parser.parse_args().output)
\ No newline at end of file
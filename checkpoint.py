@@ -0,0 +1,90 @@
+import json
+import os
+import time
+import pandas
+
+
+def _encode(value):
+    if value is pandas.NA:
+        return None
+    raise TypeError(f'{type(value).__name__} can not be checkpointed')
+
+
+def to_json(player_id, player, salaries, seasons=None):
+    record = {'id': player_id, 'player': player, 'salaries': salaries}
+    if seasons is not None:
+        record['seasons'] = seasons
+    return json.dumps(record, default=_encode)
+
+
+class Checkpoint():
+    def __init__(self, path, fsync_interval=5.0):
+        # one json line per processed player, appended as the batch goes.
+        # lines are flushed right away but only fsync'ed every `fsync_interval` seconds
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._synced = time.monotonic()
+
+    def load(self):
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        good = 0
+        with open(self.path, mode='rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('incomplete line')
+                    records.append(json.loads(line))
+                except ValueError:
+                    # the previous run was killed mid-write, drop the partial record
+                    break
+                good += len(line)
+        if good < os.path.getsize(self.path):
+            with open(self.path, mode='r+b') as f:
+                f.truncate(good)
+        return records
+
+    def append(self, player_id, player, salaries):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, mode='a', encoding='utf-8')
+        self._file.write(to_json(player_id, player, salaries) + '\n')
+        self._file.flush()
+        if time.monotonic() - self._synced >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._synced = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class JsonLines():
+    def __init__(self, path):
+        # rows appended to a json lines file as they come, nothing is kept in memory
+        self.path = path
+        self._file = None
+
+    def open(self, append=False):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._file = open(self.path, mode='a' if append else 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row, default=_encode) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,143 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import ipc
+
+# parquet / arrow ipc output of the scraped tables. every table has an explicit schema, so
+# whoever reads the files gets nullable ints, bools and categories back instead of
+# re-inferring types from csv text
+
+category = pa.dictionary(pa.int32(), pa.string())
+
+schemas = {
+    'players': pa.schema([
+        ('id', pa.string()),
+        ('name', pa.string()),
+        ('pos', category),
+        ('shoots', category),
+        ('age', pa.float64()),
+        ('is_alive', pa.bool_()),
+        ('height', pa.int32()),
+        ('weight', pa.int32()),
+        ('career_length', pa.int32()),
+        ('is_active', pa.bool_()),
+        ('has_hall_of_fame', pa.bool_()),
+        ('count_allstar', pa.int32()),
+        ('stat_games', pa.int32()),
+        # the pullout stats are per game averages, not counts
+        ('stat_points', pa.float64()),
+        ('stat_total_rebounds', pa.float64()),
+        ('stat_assists', pa.float64()),
+        ('stat_field_goal_pct', pa.float64()),
+        ('stat_three_point_field_goal_pct', pa.float64()),
+        ('stat_effective_field_goal_pct', pa.float64()),
+        ('stat_free_throw_pct', pa.float64()),
+        ('stat_efficiency_rating', pa.float64()),
+        ('stat_win_shares', pa.float64()),
+    ]),
+    'salaries': pa.schema([
+        ('player_id', pa.string()),
+        ('season', pa.string()),
+        ('salary', pa.int64()),
+    ]),
+    'roster_data': pa.schema([
+        ('team_name', category),
+        ('season', pa.string()),
+        ('player_id', pa.string()),
+        ('player_position', category),
+    ]),
+    'champions': pa.schema([
+        ('Season', pa.string()),
+        ('Champion', category),
+        ('Team_ID', category),
+    ]),
+    'awards': pa.schema([
+        ('award_type', category),
+        ('player_id', pa.string()),
+        ('season', pa.string()),
+        ('player_age', pa.int32()),
+        ('team', category),
+        ('games', pa.int32()),
+        ('minutes_per_game', pa.float64()),
+        ('points_per_game', pa.float64()),
+        ('total_rebounds_per_game', pa.float64()),
+        ('assists_per_game', pa.float64()),
+        ('steals_per_game', pa.float64()),
+        ('blocks_per_game', pa.float64()),
+        ('pct_field_goals', pa.float64()),
+        ('pct_threeP_field_goals', pa.float64()),
+        ('pct_ft_field_goals', pa.float64()),
+        ('win_shares', pa.float64()),
+        ('win_shares_48', pa.float64()),
+    ]),
+    'player_evaluations': pa.schema([
+        ('player_id', pa.string()),
+        ('won_at_age', pa.int32()),
+        ('season', pa.string()),
+        ('rank', pa.int32()),
+        ('team', category),
+        ('player_position', category),
+        ('points', pa.int32()),
+    ]),
+}
+
+extensions = {'parquet': '.parquet', 'arrow': '.arrow'}
+# arrow type -> pandas dtype on read: ints and bools with nulls stay ints and bools
+pandas_types = {
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+    pa.string(): pd.StringDtype(),
+}
+
+
+def output_path(filename, output):
+    # ./scraped/players.csv -> ./scraped/players.parquet
+    return os.path.splitext(filename)[0] + extensions[output]
+
+
+def _coerce(df, schema):
+    columns = {}
+    for field in schema:
+        values = df[field.name]
+        if pa.types.is_dictionary(field.type):
+            columns[field.name] = values.astype('string').astype('category')
+        elif field.type in (pa.int32(), pa.int64()):
+            columns[field.name] = pd.to_numeric(values, errors='coerce').astype(pandas_types[field.type])
+        elif field.type == pa.float64():
+            columns[field.name] = pd.to_numeric(values, errors='coerce').astype('float64')
+        else:
+            columns[field.name] = values.astype(pandas_types[field.type])
+    return pd.DataFrame(columns)
+
+
+def to_arrow(df, table):
+    schema = schemas[table]
+    return pa.Table.from_pandas(_coerce(df, schema), schema=schema, preserve_index=False)
+
+
+def write(df, table, filename, output):
+    # writes `df` (a DataFrame or an arrow table) as `output` ('parquet' or 'arrow') next to
+    # where the csv would go, returns the path written
+    path = output_path(filename, output)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    arrow_table = df.cast(schemas[table]) if isinstance(df, pa.Table) else to_arrow(df, table)
+    if output == 'parquet':
+        pq.write_table(arrow_table, path, compression='zstd')
+    elif output == 'arrow':
+        options = ipc.IpcWriteOptions(compression='zstd')
+        with ipc.new_file(path, arrow_table.schema, options=options) as writer:
+            writer.write_table(arrow_table)
+    else:
+        raise ValueError(f'unknown output type {output}')
+    return path
+
+
+def read(path):
+    if path.endswith(extensions['parquet']):
+        arrow_table = pq.read_table(path)
+    else:
+        with ipc.open_file(path) as reader:
+            arrow_table = reader.read_all()
+    return arrow_table.to_pandas(types_mapper=pandas_types.get)
@@ -1,7 +1,16 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, ForeignKey, select
-from sqlalchemy.orm import declarative_base, relationship, Session
+import argparse
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, ForeignKey, Index, Text, select
+from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.schema import CreateTable, DropTable
+import json
+import os
+import sys
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import columnar
+
 engine = create_engine("sqlite:///db/main.db")
 
 Base = declarative_base()
@@ -38,14 +47,23 @@ class Player(Base):
     player_evaluations = relationship(
         'PlayerEvaluation', back_populates='player')
     awards = relationship('Award', back_populates='player')
+    season_stats = relationship('SeasonStat', back_populates='player')
 
 
 class Salary(Base):
     __tablename__ = "salaries"
 
+    # natural key, what sync matches csv rows and table rows on
+    __table_args__ = (Index('ux_salaries_key', 'player_id', 'season', 'stint', unique=True),
+                      Index('ix_salaries_player_season', 'player_id', 'season_start'))
+
     id = Column(Integer, primary_key=True, autoincrement=True)
-    player_id = Column(String(50), ForeignKey('players.id'))
-    season = Column(String(50))
+    player_id = Column(String(50), ForeignKey('players.id'), index=True)
+    season = Column(String(50), index=True)
+    # first year of the season, what the tables are joined on
+    season_start = Column(Integer)
+    # a player paid by two teams in a season has two rows, numbered in page order
+    stint = Column(Integer)
     salary = Column(Integer)
     player = relationship('Player', back_populates='salaries')
 
@@ -53,10 +71,16 @@ class Salary(Base):
 class RosterData(Base):
     __tablename__ = "roster_data"
 
+    __table_args__ = (Index('ux_roster_data_key', 'team_name', 'season', 'player_id', unique=True),
+                      Index('ix_roster_data_player_season', 'player_id', 'season_start'),
+                      Index('ix_roster_data_team_season', 'team_id', 'season_start'))
+
     id = Column(Integer, primary_key=True, autoincrement=True)
-    player_id = Column(String(50), ForeignKey('players.id'))
+    player_id = Column(String(50), ForeignKey('players.id'), index=True)
     team_name = Column(String(255))
-    season = Column(String(50))
+    season = Column(String(50), index=True)
+    season_start = Column(Integer)
+    team_id = Column(String(3))
     player_position = Column(String(50))
     player = relationship('Player', back_populates='roster_datas')
     champions = relationship('Champion', back_populates='roster_data')
@@ -65,12 +89,18 @@ class RosterData(Base):
 class PlayerEvaluation(Base):
     __tablename__ = "player_evaluations"
 
+    __table_args__ = (Index('ux_player_evaluations_key', 'player_id', 'season', unique=True),
+                      Index('ix_player_evaluations_player_season', 'player_id', 'season_start'),
+                      Index('ix_player_evaluations_team_season', 'team_id', 'season_start'))
+
     id = Column(Integer, primary_key=True, autoincrement=True)
-    player_id = Column(String(50), ForeignKey('players.id'))
+    player_id = Column(String(50), ForeignKey('players.id'), index=True)
     won_at_age = Column(Integer)
-    season = Column(String(50))
+    season = Column(String(50), index=True)
+    season_start = Column(Integer)
     rank = Column(Integer)
     team = Column(String(50))
+    team_id = Column(String(3))
     player_position = Column(String(50))
     points = Column(Integer)
     player = relationship('Player', back_populates='player_evaluations')
@@ -79,12 +109,18 @@ class PlayerEvaluation(Base):
 class Award(Base):
     __tablename__ = "awards"
 
+    __table_args__ = (Index('ux_awards_key', 'award_type', 'season', 'player_id', unique=True),
+                      Index('ix_awards_player_season', 'player_id', 'season_start'),
+                      Index('ix_awards_team_season', 'team_id', 'season_start'))
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     award_type = Column(String(50))
-    player_id = Column(String(50), ForeignKey('players.id'))
-    season = Column(String(50))
+    player_id = Column(String(50), ForeignKey('players.id'), index=True)
+    season = Column(String(50), index=True)
+    season_start = Column(Integer)
     player_age = Column(Integer)
     team = Column(String(50))
+    team_id = Column(String(3))
     games = Column(Integer)
     minutes_per_game = Column(Float)
     points_per_game = Column(Float)
@@ -103,30 +139,328 @@ class Award(Base):
 class Champion(Base):
     __tablename__ = "champions"
 
+    __table_args__ = (Index('ux_champions_key', 'season', 'team_id', unique=True),
+                      Index('ix_champions_team_season', 'team_id', 'season_start'))
+
     id = Column(Integer, primary_key=True, autoincrement=True)
-    season = Column(String(50))
+    season = Column(String(50), index=True)
+    season_start = Column(Integer)
     team = Column(String(50))
-    team_id = Column(String(50))
+    team_id = Column(String(50), index=True)
     roster_data = relationship('RosterData', back_populates='champions')
 
 
-Base.metadata.create_all(engine)
-
-df1 = pd.read_csv("scraped/players.csv")
-df1.to_sql("players", con=engine, if_exists="replace", index=False)
-df2 = pd.read_csv("scraped/salaries.csv")
-df2.to_sql("salaries", con=engine, if_exists="replace", index=False)
-df3 = pd.read_csv("scraped/roster_data.csv")
-df3.to_sql("roster_data", con=engine, if_exists="replace", index=False)
-df4 = pd.read_csv("scraped/player_evaluations.csv")
-df4.to_sql("player_evaluations", con=engine,
-           if_exists="append", index=False)
-df5 = pd.read_csv("scraped/basketball_dpoy.csv")
-df6 = pd.read_csv("scraped/mvp_winners.csv")
-df6["award_type"] = "MVP"
-df_awards = pd.concat([df5, df6])
-df_awards.to_sql("awards", con=engine, if_exists="replace", index=False)
-df7 = pd.read_csv("scraped/champions.csv")
-df7.to_sql("champions", con=engine, if_exists="replace", index=False)
-
-session = Session(engine)
+class SeasonStat(Base):
+    __tablename__ = "season_stats"
+
+    # the season lines of the per_game/totals/advanced tables of the player pages, written by
+    # PlayerScraper with season_stats set. a traded player has a line per team and one over all
+    # of them (TOT/2TM...), which has no team_id
+    __table_args__ = (Index('ux_season_stats_key', 'player_id', 'kind', 'season', 'team', unique=True),
+                      Index('ix_season_stats_player_season', 'player_id', 'season_start'),
+                      Index('ix_season_stats_team_season', 'team_id', 'season_start'))
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    player_id = Column(String(50), ForeignKey('players.id'), index=True)
+    # which table of the page the line is from
+    kind = Column(String(50))
+    season = Column(String(50))
+    season_start = Column(Integer)
+    team = Column(String(50))
+    team_id = Column(String(3))
+    # the rest of the line as a json object, the columns differ from table to table
+    stats = Column(Text)
+    player = relationship('Player', back_populates='season_stats')
+
+
+class Kpi(Base):
+    __tablename__ = "kpis"
+
+    # filled by db/kpis.py. a row with a season has that season's salary kpis, the row without
+    # one (per player) the career kpis and the z-scores of the career stats
+    __table_args__ = (Index('ix_kpis_player_season', 'player_id', 'season_start'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    player_id = Column(String(50), ForeignKey('players.id'))
+    season = Column(String(50))
+    season_start = Column(Integer)
+    salary = Column(Integer)
+    salary_percentile = Column(Float)
+    salary_z = Column(Float)
+    total_salary = Column(Integer)
+    salary_per_win_share = Column(Float)
+    points_per_dollar = Column(Float)
+    z_games = Column(Float)
+    z_points = Column(Float)
+    z_total_rebounds = Column(Float)
+    z_assists = Column(Float)
+    z_field_goal_pct = Column(Float)
+    z_three_point_field_goal_pct = Column(Float)
+    z_effective_field_goal_pct = Column(Float)
+    z_free_throw_pct = Column(Float)
+    z_efficiency_rating = Column(Float)
+    z_win_shares = Column(Float)
+
+
+# csv -> table it loads into, with the csv columns that are named differently from the table's
+csv_tables = {
+    'players': ('scraped/players.csv', {}),
+    'salaries': ('scraped/salaries.csv', {}),
+    'roster_data': ('scraped/roster_data.csv', {}),
+    'player_evaluations': ('scraped/player_evaluations.csv', {}),
+    'champions': ('scraped/champions.csv', {'Season': 'season', 'Champion': 'team', 'Team_ID': 'team_id'}),
+}
+award_files = {
+    'DPOY': 'scraped/basketball_dpoy.csv',
+    'MVP': 'scraped/mvp_winners.csv',
+}
+season_stats_file = 'scraped/season_stats.jsonl'
+# full team name -> the abbreviation the site uses for it in team urls (and in the award and
+# evaluation tables), for the teams in the roster data. older names come from the champions
+# csv, which has both. 'Charlotte Hornets' was CHH before 2002, the rosters start in 2015
+team_ids = {
+    'Atlanta Hawks': 'ATL', 'Boston Celtics': 'BOS', 'Brooklyn Nets': 'BRK', 'Charlotte Hornets': 'CHO',
+    'Chicago Bulls': 'CHI', 'Cleveland Cavaliers': 'CLE', 'Dallas Mavericks': 'DAL', 'Denver Nuggets': 'DEN',
+    'Detroit Pistons': 'DET', 'Golden State Warriors': 'GSW', 'Houston Rockets': 'HOU', 'Indiana Pacers': 'IND',
+    'Los Angeles Clippers': 'LAC', 'Los Angeles Lakers': 'LAL', 'Memphis Grizzlies': 'MEM', 'Miami Heat': 'MIA',
+    'Milwaukee Bucks': 'MIL', 'Minnesota Timberwolves': 'MIN', 'New Orleans Pelicans': 'NOP',
+    'New York Knicks': 'NYK', 'Oklahoma City Thunder': 'OKC', 'Orlando Magic': 'ORL', 'Philadelphia 76ers': 'PHI',
+    'Phoenix Suns': 'PHO', 'Portland Trail Blazers': 'POR', 'Sacramento Kings': 'SAC', 'San Antonio Spurs': 'SAS',
+    'Toronto Raptors': 'TOR', 'Utah Jazz': 'UTA', 'Washington Wizards': 'WAS',
+}
+# the column each table names its team in
+team_columns = {'roster_data': 'team_name', 'player_evaluations': 'team', 'awards': 'team', 'champions': 'team_id',
+                'season_stats': 'team'}
+# a season line over several teams (traded players) is not any one team's
+multi_team = ['TOT', '2TM', '3TM', '4TM', '5TM']
+
+
+def read_csv(path, columns=None):
+    # a scraper run with --output parquet/arrow leaves that file next to the csv, typed;
+    # whichever of them was written last is read
+    candidates = [path] + [columnar.output_path(path, output) for output in columnar.extensions]
+    newest = max((p for p in candidates if os.path.exists(p)), key=os.path.getmtime, default=path)
+    if newest == path:
+        # some of the scrapers write a byte order mark
+        df = pd.read_csv(path, encoding='utf-8-sig')
+    else:
+        df = columnar.read(newest)
+    return df.rename(columns=columns or {})
+
+
+def read_awards(files=award_files):
+    frames = []
+    for award_type, path in files.items():
+        df = read_csv(path)
+        df['award_type'] = award_type
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_season_stats(path=season_stats_file):
+    # one json line per season line; the columns the table has are taken out, the rest stays
+    # together in `stats`
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = json.loads(line)
+            # older pages name the team column team_id
+            team = line.pop('team_name_abbr', None) or line.pop('team_id', None)
+            rows.append({'player_id': line.pop('player_id'), 'kind': line.pop('table'),
+                         'season': line.pop('season', None), 'team': team, 'stats': json.dumps(line)})
+    return pd.DataFrame(rows, columns=['player_id', 'kind', 'season', 'team', 'stats'])
+
+
+def natural_key(table):
+    for index in table.indexes:
+        if index.unique:
+            return [column.name for column in index.columns]
+    return [column.name for column in table.primary_key.columns]
+
+
+def dedupe(name, df):
+    # a key seen twice in a csv keeps its last row
+    return df.drop_duplicates(natural_key(Base.metadata.tables[name]), keep='last')
+
+
+def season_start(seasons):
+    # '2022-23' and '2019-2020' (player_evaluations) both start in 2022/2019. a column only
+    # has a few dozen distinct seasons, each is parsed once
+    codes, uniques = pd.factorize(seasons)
+    starts = pd.to_numeric(pd.Series(uniques, dtype=object).astype(str).str.extract(r'^(\d{4})', expand=False),
+                           errors='coerce').astype('Int64')
+    return pd.Series(starts.array.take(codes, allow_fill=True), index=seasons.index)
+
+
+def canonical_team_id(teams, names):
+    # abbreviations stay as they are, full names are looked up
+    teams = teams.astype(object)
+    return teams.map(names).fillna(teams).where(~teams.isin(multi_team))
+
+
+def normalize(frames):
+    # integer season_start and canonical team_id next to the text columns the scrapers write,
+    # so the tables join on short indexed keys instead of comparing free text
+    names = {}
+    if 'champions' in frames:
+        names.update(zip(frames['champions']['team'], frames['champions']['team_id']))
+    # the champions csv names a team by what it was called that season (the ABA 'Indiana Pacers'
+    # are INA), the curated ids are the ones the rosters and the other tables use
+    names.update(team_ids)
+    for name, df in frames.items():
+        if 'season' in df.columns:
+            df['season_start'] = season_start(df['season'])
+        if name in team_columns and name != 'champions':
+            df['team_id'] = canonical_team_id(df[team_columns[name]], names)
+    return frames
+
+
+def read_tables():
+    frames = {name: read_csv(path, columns) for name, (path, columns) in csv_tables.items()}
+    frames['awards'] = read_awards()
+    if os.path.exists(season_stats_file):
+        frames['season_stats'] = read_season_stats()
+    salaries = frames['salaries']
+    salaries['stint'] = salaries.groupby(['player_id', 'season']).cumcount()
+    return normalize({name: dedupe(name, df) for name, df in frames.items()})
+
+
+def _rows(df, columns):
+    # plain python values, NaN as NULL, in the column order of the insert
+    values = []
+    for column in columns:
+        series = df[column]
+        if series.hasnans:
+            values.append(series.astype(object).where(series.notna(), None).tolist())
+        else:
+            values.append(series.tolist())
+    return list(zip(*values))
+
+
+def bulk_load(engine, frames):
+    # the declared schema is created once; a load replaces the contents of every table it is
+    # given, so running it again gives the same database. rows go in through one executemany
+    # per table in a single transaction, and the indexes are built after the rows are in
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql('PRAGMA journal_mode=WAL')
+        conn.exec_driver_sql('PRAGMA synchronous=OFF')
+        try:
+            # pysqlite only sends BEGIN ahead of an insert, the drops and creates before it
+            # would each commit on their own
+            conn.exec_driver_sql('BEGIN')
+            for name, df in frames.items():
+                table = Base.metadata.tables[name]
+                # dropping the table is cheaper than deleting its rows one by one, and it is
+                # created again without its indexes
+                conn.execute(DropTable(table, if_exists=True))
+                conn.execute(CreateTable(table))
+                # the surrogate ids are the database's own, whatever the csv has
+                columns = [c.name for c in table.columns if c.name in df.columns and c.autoincrement is not True]
+                placeholders = ', '.join('?' for _ in columns)
+                conn.exec_driver_sql(f'INSERT INTO {name} ({", ".join(columns)}) VALUES ({placeholders})',
+                                     _rows(df, columns))
+            for name in frames:
+                for index in Base.metadata.tables[name].indexes:
+                    index.create(conn)
+            # row counts for the planner, without them it scans the big side of a join
+            conn.exec_driver_sql('ANALYZE')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            # the safety level can't be changed inside a transaction, it is restored once the
+            # load is committed or rolled back
+            conn.exec_driver_sql('PRAGMA synchronous=FULL')
+    return {name: len(df) for name, df in frames.items()}
+
+
+def _migrate(conn, table):
+    # a database loaded before a column or index was declared gets it here. the new columns
+    # stay NULL until the upsert below fills them in
+    existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table.name})')}
+    for column in table.columns:
+        if column.name not in existing:
+            conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} '
+                                 f'{column.type.compile(dialect=conn.dialect)}')
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _has_key(conn, table):
+    # whether the table has the unique constraint the upsert's ON CONFLICT needs. the ones
+    # pandas' to_sql wrote before the schema was declared have no key at all
+    key = set(natural_key(table))
+    if {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table.name})') if row[5]} == key:
+        return True
+    for index in conn.exec_driver_sql(f'PRAGMA index_list({table.name})').fetchall():
+        if index[2] and {row[2] for row in conn.exec_driver_sql(f'PRAGMA index_info("{index[1]}")')} == key:
+            return True
+    return False
+
+
+def sync(engine, frames):
+    # applies only the difference between the csvs and the tables: rows are matched on the
+    # natural key, new and changed ones go through one upsert, rows gone from the csv are
+    # deleted. one transaction, and with WAL readers keep reading while it runs
+    Base.metadata.create_all(engine)
+    counts = {}
+    with engine.connect() as conn:
+        keyless = [name for name in frames if not _has_key(conn, Base.metadata.tables[name])]
+    if keyless:
+        # nothing to match rows on (and maybe duplicate keys), these are rebuilt from the
+        # deduplicated csvs instead
+        print(f'{", ".join(keyless)}: no unique key on the natural key, reloaded in full')
+        for name, count in bulk_load(engine, {name: frames[name] for name in keyless}).items():
+            counts[name] = {'reloaded': count}
+    with engine.connect() as conn:
+        conn.exec_driver_sql('PRAGMA journal_mode=WAL')
+        # an explicit BEGIN, or the ALTER TABLEs of _migrate would commit on their own
+        conn.exec_driver_sql('BEGIN')
+        for name, df in frames.items():
+            if name in keyless:
+                continue
+            table = Base.metadata.tables[name]
+            _migrate(conn, table)
+            key = natural_key(table)
+            values = [c.name for c in table.columns if c.name in df.columns and c.name not in key
+                      and c.autoincrement is not True]
+            columns = [*key, *values]
+            incoming = {row[:len(key)]: row[len(key):] for row in _rows(df, columns)}
+            existing = {row[:len(key)]: row[len(key):]
+                        for row in conn.exec_driver_sql(f'SELECT {", ".join(columns)} FROM {name}')}
+            inserts = [k + v for k, v in incoming.items() if k not in existing]
+            updates = [k + v for k, v in incoming.items() if k in existing and existing[k] != v]
+            deletes = [k for k in existing if k not in incoming]
+            if inserts or updates:
+                placeholders = ', '.join('?' for _ in columns)
+                assignments = ', '.join(f'{c} = excluded.{c}' for c in values) if values else None
+                conflict = f'DO UPDATE SET {assignments}' if assignments else 'DO NOTHING'
+                conn.exec_driver_sql(f'INSERT INTO {name} ({", ".join(columns)}) VALUES ({placeholders}) '
+                                     f'ON CONFLICT ({", ".join(key)}) {conflict}', inserts + updates)
+            if deletes:
+                # IS rather than =, a NULL in a key still matches its row
+                conn.exec_driver_sql(f'DELETE FROM {name} WHERE {" AND ".join(f"{c} IS ?" for c in key)}', deletes)
+            counts[name] = {'inserted': len(inserts), 'updated': len(updates), 'deleted': len(deletes),
+                            'unchanged': len(incoming) - len(inserts) - len(updates)}
+        conn.exec_driver_sql('ANALYZE')
+        conn.commit()
+    return {name: counts[name] for name in frames}
+
+
+def main(mode='load'):
+    if mode == 'sync':
+        for name, applied in sync(engine, read_tables()).items():
+            print(f'{name}: ' + ', '.join(f'{count} {what}' for what, count in applied.items()))
+    else:
+        counts = bulk_load(engine, read_tables())
+        for name, count in counts.items():
+            print(f'{name}: {count} rows')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sync', action='store_const', const='sync', default='load', dest='mode',
+                        help='apply only what changed in the csvs instead of rebuilding every table')
+    main(parser.parse_args().mode)
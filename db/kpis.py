@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+import db_main
+import columnar
+
+# player kpis from the players and salaries csvs, written to the kpis table. everything is
+# computed a column at a time on integer codes of the player ids and seasons (numpy bincount,
+# one sort for the percentiles), there is no loop over rows and no groupby on strings:
+# - per season: salary (summed over stints), its percentile and z-score within the season
+# - per player: total salary, salary per career win share, career points per dollar and the
+#   z-scores of the career stats against every player scraped
+
+# the career stats of players.csv (PlayerScraper.columns), stat_points -> z_points
+career_stats = [field.name for field in columnar.schemas['players'] if field.name.startswith('stat_')]
+z_columns = {stat: 'z_' + stat[len('stat_'):] for stat in career_stats}
+
+
+def _percentile(values, groups, group_count):
+    # what groupby(groups).rank(pct=True) gives, tied values share their average rank
+    n = len(values)
+    if not n:
+        return np.empty(0)
+    order = np.lexsort((values, groups))
+    v, g = values[order], groups[order]
+    new_group = np.r_[True, g[1:] != g[:-1]]
+    new_value = new_group | np.r_[True, v[1:] != v[:-1]]
+    group_start = np.maximum.accumulate(np.where(new_group, np.arange(n), 0))
+    tie_first = np.flatnonzero(new_value)
+    tie_last = np.r_[tie_first[1:], n] - 1
+    rank = (tie_first + tie_last)[np.cumsum(new_value) - 1] / 2 - group_start + 1
+    percentile = np.empty(n)
+    percentile[order] = rank / np.bincount(groups, minlength=group_count)[g]
+    return percentile
+
+
+def season_kpis(salaries, player_codes, player_ids):
+    season_codes, seasons = pd.factorize(salaries['season'])
+    valid = (player_codes >= 0) & (season_codes >= 0)
+    # (player, season) pairs in the order they first appear, like groupby(sort=False)
+    key_codes, keys = pd.factorize(player_codes[valid].astype(np.int64) * len(seasons) + season_codes[valid])
+    paid = np.nan_to_num(salaries['salary'].to_numpy(float, na_value=np.nan)[valid])
+    salary = np.bincount(key_codes, weights=paid, minlength=len(keys))
+    season_of = keys % len(seasons)
+
+    counts = np.bincount(season_of, minlength=len(seasons))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviation = salary - (np.bincount(season_of, weights=salary, minlength=len(seasons)) / counts)[season_of]
+        std = np.sqrt(np.bincount(season_of, weights=deviation ** 2, minlength=len(seasons)) / (counts - 1))
+        salary_z = deviation / np.where(std > 0, std, np.nan)[season_of]
+    starts = db_main.season_start(pd.Series(seasons, dtype=object)).array
+    return pd.DataFrame({
+        'player_id': player_ids.take(keys // len(seasons)),
+        'season': seasons.take(season_of),
+        'season_start': starts.take(season_of),
+        'salary': pd.array(salary.astype(np.int64), dtype='Int64'),
+        'salary_percentile': _percentile(salary, season_of, len(seasons)),
+        'salary_z': salary_z,
+    })
+
+
+def career_kpis(players, player_codes, salaries, salary_codes, id_count):
+    valid = salary_codes >= 0
+    paid = np.nan_to_num(salaries['salary'].to_numpy(float, na_value=np.nan)[valid])
+    totals = np.where(np.bincount(salary_codes[valid], minlength=id_count) > 0,
+                      np.bincount(salary_codes[valid], weights=paid, minlength=id_count), np.nan)
+    total_salary = np.where(player_codes >= 0, totals[player_codes], np.nan)
+    stats = players[career_stats].to_numpy(float, na_value=np.nan)
+    win_shares = stats[:, career_stats.index('stat_win_shares')]
+    # the pullout has points per game, times games is the career total
+    points = stats[:, career_stats.index('stat_games')] * stats[:, career_stats.index('stat_points')]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        salary_per_win_share = np.where(win_shares > 0, total_salary / win_shares, np.nan)
+        points_per_dollar = np.where(total_salary > 0, points / total_salary, np.nan)
+        std = np.nanstd(stats, axis=0, ddof=1)
+        z = (stats - np.nanmean(stats, axis=0)) / np.where(std > 0, std, np.nan)
+    career = pd.DataFrame({
+        'player_id': players['id'].to_numpy(),
+        'total_salary': pd.Series(total_salary).astype('Int64'),
+        'salary_per_win_share': salary_per_win_share,
+        'points_per_dollar': points_per_dollar,
+    })
+    for i, stat in enumerate(career_stats):
+        career[z_columns[stat]] = z[:, i]
+    return career
+
+
+def compute(players, salaries):
+    # season rows first, then one career row per player (season and season_start NULL).
+    # both tables' player ids are coded in one pass
+    codes, ids = pd.factorize(pd.concat([players['id'], salaries['player_id']], ignore_index=True))
+    player_codes, salary_codes = codes[:len(players)], codes[len(players):]
+    return pd.concat([season_kpis(salaries, salary_codes, ids),
+                      career_kpis(players, player_codes, salaries, salary_codes, len(ids))], ignore_index=True)
+
+
+def read_inputs():
+    players = db_main.read_csv(db_main.csv_tables['players'][0])
+    salaries = db_main.read_csv(db_main.csv_tables['salaries'][0])
+    return players, salaries
+
+
+def main():
+    kpis = compute(*read_inputs())
+    db_main.bulk_load(db_main.engine, {'kpis': kpis})
+    print(f'kpis: {len(kpis)} rows')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import db_main
+
+# read side of db/main.db for code that only needs a few rows: a read-only connection per
+# thread, fixed sql text (sqlite3 keeps the prepared statements per connection) and a bounded
+# lru cache of results. the cache is dropped whenever the database changes, which sqlite
+# reports through PRAGMA data_version on a connection kept open for that.
+# results are sqlite3.Row (and tuples of them), read-only and shared between callers
+
+player_sql = 'SELECT * FROM players WHERE id = ?'
+salary_sql = ('SELECT season, season_start, stint, salary FROM salaries WHERE player_id = ? '
+              'ORDER BY season_start, stint')
+roster_sql = ('SELECT player_id, team_name, team_id, season, player_position FROM roster_data '
+              'WHERE team_id = ? AND season_start = ? ORDER BY player_id')
+awards_sql = ('SELECT * FROM awards WHERE award_type = ? AND season_start IN (SELECT value FROM json_each(?)) '
+              'ORDER BY season_start')
+all_awards_sql = 'SELECT * FROM awards WHERE award_type = ? ORDER BY season_start'
+# a cached None is a result too
+_missing = object()
+
+
+class Lookups():
+    def __init__(self, path='db/main.db', maxsize=4096):
+        self.uri = f'file:{path}?mode=ro'
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # sqlite connections can't be shared between threads, so every thread opens its own
+        self._local = threading.local()
+        # data_version changes on this connection whenever any other one commits, so it has to
+        # stay open from before the first result is cached
+        self._watch = self._connect()
+        self._version = self._data_version()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False, cached_statements=32)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _data_version(self):
+        return self._watch.execute('PRAGMA data_version').fetchone()[0]
+
+    def _query(self, key, sql, params, one=False):
+        with self._lock:
+            version = self._data_version()
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            result = self._cache.get(key, _missing)
+            if result is not _missing:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        rows = self._connection().execute(sql, params).fetchall()
+        if one:
+            result = rows[0] if rows else None
+        else:
+            result = tuple(rows)
+        with self._lock:
+            # a commit seen by another lookup while this query ran may have come after the
+            # rows were read, they are only cached if the version is still the one checked
+            if self._version == version:
+                self._cache[key] = result
+                if len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return result
+
+    def get_player(self, player_id):
+        return self._query(('player', player_id), player_sql, (player_id,), one=True)
+
+    def salary_history(self, player_id):
+        return self._query(('salaries', player_id), salary_sql, (player_id,))
+
+    def roster(self, team, season):
+        # team as an id ('BOS') or a full name, season as '2022-23' or its first year
+        team_id = db_main.team_ids.get(team, team)
+        season_start = int(str(season)[:4])
+        return self._query(('roster', team_id, season_start), roster_sql, (team_id, season_start))
+
+    def award_winners(self, award_type, seasons=None):
+        # every season when seasons is None
+        if seasons is None:
+            return self._query(('awards', award_type, None), all_awards_sql, (award_type,))
+        starts = tuple(sorted({int(str(season)[:4]) for season in seasons}))
+        return self._query(('awards', award_type, starts), awards_sql, (award_type, json.dumps(starts)))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        # only this thread's connection, the others go with their threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        self._watch.close()
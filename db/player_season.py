@@ -0,0 +1,174 @@
+import argparse
+import hashlib
+from sqlalchemy import Table, Column, Integer, String, Float, Boolean, Index, PrimaryKeyConstraint
+
+import db_main
+
+# player_season: one row per (player_id, season_start) with what the analysis keeps joining
+# players, roster_data, salaries, awards, player_evaluations and champions for. built after
+# db_main.py has loaded or synced the tables. only seasons (and players) whose source rows
+# changed since the last build are recomputed; a digest of every season of every source table
+# is kept in player_season_sources to tell
+
+# award type -> flag column, for the awards db_main loads
+award_flags = {award_type: f'is_{award_type.lower()}' for award_type in db_main.award_files}
+# per game stats of the season, from the award rows (only award winners have them)
+award_stats = ['points_per_game', 'total_rebounds_per_game', 'assists_per_game', 'win_shares', 'pct_threeP_field_goals']
+
+player_season = Table(
+    'player_season', db_main.Base.metadata,
+    Column('player_id', String(50)),
+    Column('season_start', Integer),
+    Column('season', String(50)),
+    Column('name', String(255)),
+    Column('pos', String(255)),
+    Column('height', Integer),
+    Column('weight', Integer),
+    Column('career_length', Integer),
+    Column('is_active', Boolean),
+    # the team when the player was on one roster that season, team_count says how many
+    Column('team_id', String(3)),
+    Column('team_count', Integer),
+    Column('player_position', String(50)),
+    Column('is_champion', Boolean),
+    # summed over the stints of the season
+    Column('salary', Integer),
+    *[Column(flag, Boolean) for flag in award_flags.values()],
+    *[Column(stat, Float) for stat in award_stats],
+    Column('eval_rank', Integer),
+    Column('eval_points', Integer),
+    PrimaryKeyConstraint('player_id', 'season_start'),
+    Index('ix_player_season_team', 'team_id', 'season_start'),
+    # covering indexes for the champion rosters and top-n scorers of a season
+    Index('ix_player_season_champions', 'season_start', 'is_champion', 'team_id', 'player_id', 'name',
+          'career_length', 'height'),
+    Index('ix_player_season_rank', 'season_start', 'eval_rank', 'player_id', 'name', 'eval_points',
+          'career_length', 'height', 'weight'),
+    *[Index(f'ix_player_season_{flag}', flag, 'season_start') for flag in award_flags.values()],
+)
+
+player_season_sources = Table(
+    'player_season_sources', db_main.Base.metadata,
+    Column('source', String(50)),
+    # season_start for the seasonal tables, player id for players
+    Column('part', String(50)),
+    Column('digest', String(40)),
+    PrimaryKeyConstraint('source', 'part'),
+)
+
+seasonal_sources = ['salaries', 'roster_data', 'awards', 'player_evaluations', 'champions']
+
+build_sql = f'''
+INSERT INTO player_season
+SELECT k.player_id, k.season_start, printf('%d-%02d', k.season_start, (k.season_start + 1) % 100),
+       p.name, p.pos, p.height, p.weight, p.career_length, p.is_active,
+       r.team_id, coalesce(r.team_count, 0), r.player_position, coalesce(r.is_champion, 0),
+       s.salary,
+       {', '.join(f'coalesce(a.{flag}, 0)' for flag in award_flags.values())},
+       {', '.join(f'a.{stat}' for stat in award_stats)},
+       e.rank, e.points
+FROM temp.refresh_keys k
+LEFT JOIN players p ON p.id = k.player_id
+LEFT JOIN (
+    SELECT rd.player_id, rd.season_start, count(DISTINCT rd.team_id) AS team_count,
+           CASE WHEN count(DISTINCT rd.team_id) = 1 THEN min(rd.team_id) END AS team_id,
+           min(rd.player_position) AS player_position, max(c.id IS NOT NULL) AS is_champion
+    FROM temp.refresh_keys k
+    JOIN roster_data rd ON rd.player_id = k.player_id AND rd.season_start = k.season_start
+    LEFT JOIN champions c ON c.team_id = rd.team_id AND c.season_start = rd.season_start
+    GROUP BY rd.player_id, rd.season_start
+) r ON r.player_id = k.player_id AND r.season_start = k.season_start
+LEFT JOIN (
+    SELECT s.player_id, s.season_start, sum(s.salary) AS salary
+    FROM temp.refresh_keys k
+    JOIN salaries s ON s.player_id = k.player_id AND s.season_start = k.season_start
+    GROUP BY s.player_id, s.season_start
+) s ON s.player_id = k.player_id AND s.season_start = k.season_start
+LEFT JOIN (
+    SELECT a.player_id, a.season_start,
+           {', '.join(f"max(a.award_type = '{award_type}') AS {flag}" for award_type, flag in award_flags.items())},
+           {', '.join(f'max(a.{stat}) AS {stat}' for stat in award_stats)}
+    FROM temp.refresh_keys k
+    JOIN awards a ON a.player_id = k.player_id AND a.season_start = k.season_start
+    GROUP BY a.player_id, a.season_start
+) a ON a.player_id = k.player_id AND a.season_start = k.season_start
+LEFT JOIN player_evaluations e ON e.player_id = k.player_id AND e.season_start = k.season_start
+'''
+
+
+def _digests(conn):
+    # (source, part) -> sha1 of the rows, without the surrogate ids a bulk load renumbers
+    digests = {}
+    for source in [*seasonal_sources, 'players']:
+        table = db_main.Base.metadata.tables[source]
+        columns = [c.name for c in table.columns if c.name != 'id' or source == 'players']
+        part = 'id' if source == 'players' else 'season_start'
+        order = ', '.join([part, *db_main.natural_key(table)])
+        hashes = {}
+        for row in conn.exec_driver_sql(f'SELECT {part}, {", ".join(columns)} FROM {source} ORDER BY {order}'):
+            key = str(row[0])
+            if key not in hashes:
+                hashes[key] = hashlib.sha1()
+            hashes[key].update(repr(row[1:]).encode('utf-8'))
+        digests.update({(source, key): h.hexdigest() for key, h in hashes.items()})
+    return digests
+
+
+def refresh(engine, full=False):
+    # recomputes the rows of every season whose source rows changed and of every player whose
+    # players row changed, in one transaction. returns what was refreshed
+    db_main.Base.metadata.create_all(engine, tables=[player_season, player_season_sources])
+    with engine.connect() as conn:
+        if full:
+            conn.exec_driver_sql('DELETE FROM player_season_sources')
+        digests = _digests(conn)
+        stored = {(source, part): digest for source, part, digest
+                  in conn.exec_driver_sql('SELECT source, part, digest FROM player_season_sources')}
+        changed = {key for key in digests.keys() | stored.keys() if digests.get(key) != stored.get(key)}
+        seasons = sorted({int(part) for source, part in changed if source != 'players' and part != 'None'})
+        players = sorted({part for source, part in changed if source == 'players'})
+
+        conn.exec_driver_sql('CREATE TEMP TABLE IF NOT EXISTS refresh_seasons (season_start INTEGER PRIMARY KEY)')
+        conn.exec_driver_sql('CREATE TEMP TABLE IF NOT EXISTS refresh_players (player_id TEXT PRIMARY KEY)')
+        conn.exec_driver_sql('DROP TABLE IF EXISTS temp.refresh_keys')
+        conn.exec_driver_sql('DELETE FROM temp.refresh_seasons')
+        conn.exec_driver_sql('DELETE FROM temp.refresh_players')
+        if seasons:
+            conn.exec_driver_sql('INSERT INTO temp.refresh_seasons VALUES (?)', [(season,) for season in seasons])
+        if players:
+            conn.exec_driver_sql('INSERT INTO temp.refresh_players VALUES (?)', [(player,) for player in players])
+        in_scope = ('season_start IN (SELECT season_start FROM temp.refresh_seasons) '
+                    'OR player_id IN (SELECT player_id FROM temp.refresh_players)')
+        # every (player, season) the facts come from, within the refreshed seasons and players
+        conn.exec_driver_sql(f'''
+            CREATE TEMP TABLE refresh_keys AS
+            SELECT player_id, season_start FROM (
+                {" UNION ".join(f"SELECT player_id, season_start FROM {source}" for source in seasonal_sources
+                                if source != 'champions')}
+            ) WHERE season_start IS NOT NULL AND ({in_scope})''')
+        conn.exec_driver_sql('CREATE UNIQUE INDEX temp.refresh_keys_index ON refresh_keys (player_id, season_start)')
+        conn.exec_driver_sql(f'DELETE FROM player_season WHERE {in_scope}')
+        rows = conn.exec_driver_sql(build_sql).rowcount
+
+        conn.exec_driver_sql('DELETE FROM player_season_sources')
+        conn.exec_driver_sql('INSERT INTO player_season_sources VALUES (?, ?, ?)',
+                             [(source, part, digest) for (source, part), digest in digests.items()])
+        conn.exec_driver_sql('DROP TABLE temp.refresh_keys')
+        conn.exec_driver_sql('ANALYZE player_season')
+        conn.commit()
+    return {'seasons': seasons, 'players': len(players), 'rows': rows}
+
+
+def main(full=False):
+    refreshed = refresh(db_main.engine, full)
+    if not refreshed['seasons'] and not refreshed['players']:
+        print('player_season is up to date')
+    else:
+        print(f"player_season: {refreshed['rows']} rows rebuilt for {len(refreshed['seasons'])} seasons "
+              f"and {refreshed['players']} players")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--full', action='store_true', help='rebuild every season, not just the ones that changed')
+    main(parser.parse_args().full)
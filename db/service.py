@@ -0,0 +1,319 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from time import perf_counter
+from urllib.parse import urlsplit, parse_qsl
+
+import db_main
+from metrics import Metrics
+
+# read-only http json service over db/main.db, on asyncio streams only.
+#   GET /<table>?<column>=<value>&limit=100&cursor=...   one page, {"data": [...], "next": cursor}
+#   GET /<table>?...&stream=1                            every matching row as json lines, chunked
+#   GET /<table>/<id>                                    one row by its id
+#   GET /metrics                                         prometheus text
+# pages are keyset paginated on the id column, the cursor is the last id of the page. every
+# response carries an ETag made of the query and the database generation, so a client that
+# sends it back gets a 304 without the query running. page bodies are kept in an lru cache
+# keyed by the query; both are dropped as soon as PRAGMA data_version moves. sqlite is only
+# touched from a thread pool, every thread with its own read-only connection
+
+entities = {
+    'players': db_main.Player,
+    'salaries': db_main.Salary,
+    'roster_data': db_main.RosterData,
+    'awards': db_main.Award,
+    'champions': db_main.Champion,
+}
+default_limit = 100
+max_limit = 1000
+# rows per chunk of a streamed response
+stream_batch = 500
+cache_size = 1024
+
+
+class QueryError(Exception):
+    pass
+
+
+def streamed(value):
+    return value.lower() not in ('', '0', 'false')
+
+
+class Service():
+    def __init__(self, path='db/main.db', workers=4):
+        self.uri = f'file:{path}?mode=ro'
+        self.metrics = Metrics('service')
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self._local = threading.local()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # etags from before a restart must not match, whatever the data_version is then
+        self._nonce = hashlib.sha1(f'{os.getpid()}{time.time()}'.encode()).hexdigest()[:8]
+        self._watch = self._connect()
+        self._version = self._watch.execute('PRAGMA data_version').fetchone()[0]
+        self.generation = 0
+        self.tables = {name: model.__table__ for name, model in entities.items()}
+
+    def _connect(self):
+        return sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _check_version(self):
+        # one pragma, cheap enough to run before every request
+        with self._lock:
+            version = self._watch.execute('PRAGMA data_version').fetchone()[0]
+            if version != self._version:
+                self._version = version
+                self.generation += 1
+                self._cache.clear()
+
+    # queries
+
+    def _select(self, name, params):
+        table = self.tables[name]
+        columns = [column.name for column in table.columns]
+        clauses, values = [], []
+        limit, cursor, stream = default_limit, None, False
+        for key, value in params:
+            if key == 'limit':
+                if not value.isdigit() or not 0 < int(value) <= max_limit:
+                    raise QueryError(f'limit must be between 1 and {max_limit}')
+                limit = int(value)
+            elif key == 'cursor':
+                cursor = value
+            elif key == 'stream':
+                stream = streamed(value)
+            elif key in table.columns:
+                if isinstance(table.columns[key].type, db_main.Boolean):
+                    value = {'true': 1, 'false': 0}.get(value.lower(), value)
+                clauses.append(f'{key} = ?')
+                values.append(value)
+            else:
+                raise QueryError(f'{name} has no column {key}')
+        if cursor is not None:
+            try:
+                after = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            except ValueError:
+                raise QueryError('bad cursor')
+            # ids are text or integers, anything else can't be bound
+            if isinstance(after, bool) or not isinstance(after, (int, str)):
+                raise QueryError('bad cursor')
+            clauses.append('id > ?')
+            values.append(after)
+        where = f' WHERE {" AND ".join(clauses)}' if clauses else ''
+        sql = f'SELECT {", ".join(columns)} FROM {name}{where} ORDER BY id'
+        if not stream:
+            # one row past the page says whether there is a next one
+            sql += f' LIMIT {limit + 1}'
+        return sql, values, columns, limit, stream
+
+    def _page(self, name, params):
+        sql, values, columns, limit, _ = self._select(name, params)
+        rows = self._connection().execute(sql, values).fetchall()
+        data = [dict(zip(columns, row)) for row in rows[:limit]]
+        cursor = None
+        if len(rows) > limit:
+            cursor = base64.urlsafe_b64encode(json.dumps(data[-1]['id']).encode()).decode()
+        return json.dumps({'data': data, 'next': cursor}).encode('utf-8')
+
+    def _row(self, name, row_id):
+        table = self.tables[name]
+        columns = [column.name for column in table.columns]
+        row = self._connection().execute(
+            f'SELECT {", ".join(columns)} FROM {name} WHERE id = ?', (row_id,)).fetchone()
+        return None if row is None else json.dumps(dict(zip(columns, row))).encode('utf-8')
+
+    # http
+
+    def _etag(self, target, generation):
+        digest = hashlib.sha1(target.encode('utf-8')).hexdigest()[:16]
+        return f'W/"{self._nonce}-{generation}-{digest}"'
+
+    def _cached(self, key):
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+            return body
+
+    def _store(self, key, body, generation):
+        # a body read before a change another request noticed in the meantime is not kept
+        with self._lock:
+            if self.generation != generation:
+                return
+            self._cache[key] = body
+            if len(self._cache) > cache_size:
+                self._cache.popitem(last=False)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                    if not request_line:
+                        break
+                    parts = request_line.decode('latin-1').split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        name, _, value = line.decode('latin-1').partition(':')
+                        headers[name.strip().lower()] = value.strip()
+                except ValueError:
+                    # readline gives up on a line longer than the stream's limit
+                    await self._send(writer, HTTPStatus.BAD_REQUEST, {'error': 'line too long'}, keep_alive=False)
+                    break
+                if len(parts) != 3:
+                    await self._send(writer, HTTPStatus.BAD_REQUEST, {'error': 'bad request line'}, keep_alive=False)
+                    break
+                method, target, version = parts
+                # request bodies are never read, the connection is closed after a request that
+                # has one (or any other method) instead of parsing the body as the next request
+                has_body = headers.get('content-length', '0') != '0' or 'transfer-encoding' in headers
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                              and method == 'GET' and not has_body)
+                start = perf_counter()
+                status, route = await self.respond(method, target, headers, writer, keep_alive)
+                self.metrics.observe('request_seconds', perf_counter() - start, route=route)
+                self.metrics.inc('responses_total', status=int(status))
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method, target, headers, writer, keep_alive):
+        # returns (status, route) for the metrics
+        if method != 'GET':
+            await self._send(writer, HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'read-only service'}, keep_alive)
+            return HTTPStatus.METHOD_NOT_ALLOWED, 'other'
+        url = urlsplit(target)
+        path = url.path.strip('/')
+        if path == 'metrics':
+            body = self.metrics.to_prometheus().encode('utf-8')
+            await self._send_body(writer, HTTPStatus.OK, body, keep_alive, content_type='text/plain; version=0.0.4')
+            return HTTPStatus.OK, 'metrics'
+        if path == '':
+            await self._send(writer, HTTPStatus.OK, {'tables': sorted(self.tables)}, keep_alive)
+            return HTTPStatus.OK, 'index'
+        name, _, row_id = path.partition('/')
+        if name not in self.tables:
+            await self._send(writer, HTTPStatus.NOT_FOUND, {'error': f'no table {name}'}, keep_alive)
+            return HTTPStatus.NOT_FOUND, 'other'
+
+        self._check_version()
+        generation = self.generation
+        # the query string is sorted so the same query always has the same key and etag
+        params = sorted(parse_qsl(url.query, keep_blank_values=True))
+        key = f'{path}?{"&".join(f"{k}={v}" for k, v in params)}'
+        etag = self._etag(key, generation)
+        if etag in (tag.strip() for tag in headers.get('if-none-match', '').split(',')):
+            await self._send_body(writer, HTTPStatus.NOT_MODIFIED, b'', keep_alive, etag=etag)
+            return HTTPStatus.NOT_MODIFIED, name
+        try:
+            if row_id:
+                body = await self._run(self._row, name, row_id)
+                if body is None:
+                    await self._send(writer, HTTPStatus.NOT_FOUND, {'error': f'no {name} row {row_id}'}, keep_alive)
+                    return HTTPStatus.NOT_FOUND, name
+            elif any(k == 'stream' and streamed(v) for k, v in params):
+                await self._stream(writer, name, params, etag, keep_alive)
+                return HTTPStatus.OK, name
+            else:
+                body = self._cached(key)
+                self.metrics.inc('cache_total', result='hit' if body is not None else 'miss')
+                if body is None:
+                    body = await self._run(self._page, name, params)
+                    self._store(key, body, generation)
+        except QueryError as e:
+            await self._send(writer, HTTPStatus.BAD_REQUEST, {'error': str(e)}, keep_alive)
+            return HTTPStatus.BAD_REQUEST, name
+        except sqlite3.Error as e:
+            print(f'{key}: {e}')
+            await self._send(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'database error'}, keep_alive)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, name
+        await self._send_body(writer, HTTPStatus.OK, body, keep_alive, etag=etag)
+        return HTTPStatus.OK, name
+
+    async def _stream(self, writer, name, params, etag, keep_alive):
+        # rows go out in chunks as they are read, the result set is never held in memory
+        sql, values, columns, _, _ = self._select(name, params)
+        conn = await self._run(self._connect)
+        try:
+            cursor = await self._run(conn.execute, sql, values)
+            writer.write(self._head(HTTPStatus.OK, keep_alive, content_type='application/x-ndjson',
+                                    etag=etag, chunked=True))
+            while True:
+                try:
+                    rows = await self._run(cursor.fetchmany, stream_batch)
+                except sqlite3.Error as e:
+                    # the status is already out, a stream that breaks can only be cut off
+                    print(f'{name}: {e}')
+                    raise ConnectionAbortedError()
+                if not rows:
+                    break
+                chunk = ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows).encode('utf-8')
+                writer.write(f'{len(chunk):x}\r\n'.encode() + chunk + b'\r\n')
+                await writer.drain()
+            writer.write(b'0\r\n\r\n')
+            await writer.drain()
+        finally:
+            await self._run(conn.close)
+
+    def _head(self, status, keep_alive, content_type='application/json', etag=None, length=None, chunked=False):
+        lines = [f'HTTP/1.1 {status.value} {status.phrase}', f'Content-Type: {content_type}',
+                 f'Connection: {"keep-alive" if keep_alive else "close"}']
+        if etag:
+            lines.append(f'ETag: {etag}')
+            lines.append('Cache-Control: no-cache')
+        if chunked:
+            lines.append('Transfer-Encoding: chunked')
+        elif length is not None:
+            lines.append(f'Content-Length: {length}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _send_body(self, writer, status, body, keep_alive, content_type='application/json', etag=None):
+        length = None if status == HTTPStatus.NOT_MODIFIED else len(body)
+        writer.write(self._head(status, keep_alive, content_type, etag, length) + body)
+        await writer.drain()
+
+    async def _send(self, writer, status, payload, keep_alive):
+        await self._send_body(writer, status, json.dumps(payload).encode('utf-8'), keep_alive)
+
+
+async def serve(path, host, port, workers):
+    service = Service(path, workers)
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f'serving {path} on http://{host}:{port}', flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default='db/main.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(serve(args.db, args.host, args.port, args.workers))
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+
+class TokenBucket():
+    def __init__(self, rate, burst=1):
+        # `rate` tokens are added every second, up to `burst` tokens kept in reserve
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AsyncTokenBucket():
+    def __init__(self, rate, burst=1):
+        # the same budget as TokenBucket, shared by the tasks of one event loop
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FetchEngine():
+    def __init__(self, headers=None, rate=0.25, burst=1, workers=4, timeout=30, metrics=None):
+        self.headers = headers or {}
+        # a metrics.Metrics that gets the time spent waiting for tokens and on requests
+        self.metrics = metrics
+        self.bucket = TokenBucket(rate, burst)
+        self.workers = workers
+        self.timeout = timeout
+        # requests.Session is not thread safe, so every worker keeps its own
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def get(self, url, headers=None):
+        # every request, whichever worker sends it, has to take a token first
+        if self.metrics is None:
+            self.bucket.acquire()
+            return self._session().get(url, headers=headers, timeout=self.timeout)
+        with self.metrics.timer('stage_seconds', stage='rate_wait'):
+            self.bucket.acquire()
+        with self.metrics.timer('stage_seconds', stage='fetch'):
+            response = self._session().get(url, headers=headers, timeout=self.timeout)
+        self.metrics.inc('http_responses_total', status=response.status_code)
+        return response
+
+    def map(self, fn, items):
+        # runs fn over items on the worker pool and yields the results in input order,
+        # so the caller can parse one page while the next ones are still downloading.
+        # only a small window of items is in flight to keep memory flat on long runs
+        window = self.workers * 2
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for item in items:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
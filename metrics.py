@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+# counters and latency histograms for the scrapers: time per stage (fetch, cache read, parse,
+# every extractor, save), cache hits, http statuses and extraction failures. recording one
+# value is a dict update under a lock, cheap next to parsing a page, so it stays on.
+# dump() writes json, or prometheus text for a .prom path
+
+# upper bounds of the histogram buckets, in seconds
+buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics():
+    def __init__(self, prefix='scraper'):
+        self.prefix = prefix
+        # (name, labels) -> value; a histogram is a count per bucket, one for +Inf, then the sum
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            histogram[bisect_left(buckets, seconds)] += 1
+            histogram[-1] += seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start, **labels)
+
+    def drain(self):
+        # what was recorded since the last drain, for parse workers to send back to the parent
+        with self._lock:
+            counters, histograms = self.counters, self.histograms
+            self.counters, self.histograms = {}, {}
+        return counters, histograms
+
+    def merge(self, drained):
+        counters, histograms = drained
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, other in histograms.items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    self.histograms[key] = list(other)
+                else:
+                    for i, value in enumerate(other):
+                        histogram[i] += value
+
+    def count(self, name, **labels):
+        return self.counters.get(_key(name, labels), 0)
+
+    def totals(self, name, label):
+        # seconds recorded in histogram `name`, summed per value of `label`
+        totals = {}
+        with self._lock:
+            for (metric, labels), histogram in self.histograms.items():
+                labels = dict(labels)
+                if metric == name and label in labels:
+                    totals[labels[label]] = totals.get(labels[label], 0.0) + histogram[-1]
+        return totals
+
+    def snapshot(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+        return {
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in counters],
+            'histograms': [{'name': name, 'labels': dict(labels), 'buckets': dict(zip([*buckets, '+Inf'], histogram[:-1])),
+                            'count': sum(histogram[:-1]), 'sum': histogram[-1]}
+                           for (name, labels), histogram in histograms],
+        }
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def labelled(name, labels, **extra):
+            labels = {**labels, **extra}
+            if not labels:
+                return name
+            return name + '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in labels.items()) + '}'
+
+        for counter in snapshot['counters']:
+            name = f'{self.prefix}_{counter["name"]}'
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{labelled(name, counter["labels"])} {counter["value"]}')
+        for histogram in snapshot['histograms']:
+            name = f'{self.prefix}_{histogram["name"]}'
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} histogram')
+            # prometheus buckets are cumulative
+            seen = 0
+            for bound, count in histogram['buckets'].items():
+                seen += count
+                lines.append(f'{labelled(name + "_bucket", histogram["labels"], le=bound)} {seen}')
+            lines.append(f'{labelled(name + "_sum", histogram["labels"])} {histogram["sum"]:.6f}')
+            lines.append(f'{labelled(name + "_count", histogram["labels"])} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        # written next to the target first and then moved over it, a reader never sees half a file
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if path.endswith('.prom'):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.snapshot(), indent=1)
+        tmp = path + '.tmp'
+        with open(tmp, mode='w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+        return path
@@ -0,0 +1,247 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from metrics import Metrics
+
+
+class PageCache():
+    def __init__(self, path='./data/pages.sqlite', ttl=None, max_bytes=None, level=6):
+        # raw pages are zlib compressed and stored once per content hash in a single sqlite
+        # pack file; urls point at those blobs. entries older than `ttl` seconds count as misses
+        # but stay stored, with their validators, until a new copy replaces them. the least
+        # recently used entries are evicted once the blobs go over `max_bytes`
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # one connection shared by the fetch workers, guarded by a lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('pragma journal_mode=wal')
+        self._db.execute('pragma synchronous=normal')
+        self._db.executescript('''
+            create table if not exists blobs (
+                digest text primary key,
+                data blob not null,
+                size integer not null,
+                raw_size integer not null
+            );
+            create table if not exists pages (
+                url text primary key,
+                digest text not null references blobs(digest),
+                fetched real not null,
+                accessed real not null,
+                etag text,
+                last_modified text,
+                record text
+            );
+            create index if not exists pages_accessed_index on pages(accessed);
+            create index if not exists pages_digest_index on pages(digest);
+        ''')
+        # pack files written before validators were kept
+        columns = [row[1] for row in self._db.execute('pragma table_info(pages)')]
+        for column in ['etag', 'last_modified', 'record']:
+            if column not in columns:
+                self._db.execute(f'alter table pages add column {column} text')
+
+    def get(self, url, stale=False, max_age=None, final_after=None):
+        # stale=True also returns an entry past its ttl, e.g. to revalidate it. max_age is the
+        # ttl for this one read, in place of the cache's. an entry fetched at or after the
+        # final_after timestamp never expires (a page that can't change anymore)
+        now = time.time()
+        ttl = self.ttl if max_age is None else max_age
+        with self._lock:
+            row = self._db.execute(
+                'select p.fetched, b.data from pages p join blobs b on b.digest = p.digest where p.url = ?',
+                (url,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            fetched, data = row
+            final = final_after is not None and fetched >= final_after
+            if not stale and not final and ttl is not None and now - fetched > ttl:
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._db.execute('update pages set accessed = ? where url = ?', (now, url))
+            self.hits += 1
+        return zlib.decompress(data).decode('utf-8')
+
+    def put(self, url, text, etag=None, last_modified=None):
+        # returns True when the content for this url is new or different from what was cached
+        raw = text.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        now = time.time()
+        with self._lock:
+            self._db.execute('begin')
+            try:
+                if self._db.execute('select 1 from blobs where digest = ?', (digest,)).fetchone() is None:
+                    data = zlib.compress(raw, self.level)
+                    self._db.execute('insert into blobs values (?, ?, ?, ?)', (digest, data, len(data), len(raw)))
+                old = self._db.execute('select digest, record from pages where url = ?', (url,)).fetchone()
+                changed = old is None or old[0] != digest
+                # whatever was derived from the page only holds while the content is the same
+                record = None if changed else old[1]
+                self._db.execute('insert or replace into pages values (?, ?, ?, ?, ?, ?, ?)',
+                                 (url, digest, now, now, etag, last_modified, record))
+                if old is not None and changed:
+                    self._drop_orphan(old[0])
+                if self.max_bytes is not None:
+                    self._evict()
+                self._db.execute('commit')
+            except Exception:
+                self._db.execute('rollback')
+                raise
+        return changed
+
+    def validators(self, url):
+        # (etag, last_modified) stored with the page, for conditional requests
+        with self._lock:
+            row = self._db.execute('select etag, last_modified from pages where url = ?', (url,)).fetchone()
+        return row if row is not None else (None, None)
+
+    def touch(self, url):
+        # the site answered 304, the cached copy counts as freshly fetched
+        now = time.time()
+        with self._lock:
+            self._db.execute('update pages set fetched = ?, accessed = ? where url = ?', (now, now, url))
+
+    def get_record(self, url):
+        with self._lock:
+            row = self._db.execute('select record from pages where url = ?', (url,)).fetchone()
+        return row[0] if row is not None else None
+
+    def put_record(self, url, record):
+        # text parsed out of the cached page, dropped as soon as the page content changes
+        with self._lock:
+            self._db.execute('update pages set record = ? where url = ?', (record, url))
+
+    def entries(self, pattern='%'):
+        # (url, fetched) of the cached pages whose url is LIKE `pattern`, in url order
+        with self._lock:
+            return self._db.execute('select url, fetched from pages where url like ? order by url',
+                                    (pattern,)).fetchall()
+
+    def __contains__(self, url):
+        with self._lock:
+            return self._db.execute('select 1 from pages where url = ?', (url,)).fetchone() is not None
+
+    def _delete(self, url):
+        # returns the number of bytes freed
+        row = self._db.execute('select digest from pages where url = ?', (url,)).fetchone()
+        if row is None:
+            return 0
+        self._db.execute('delete from pages where url = ?', (url,))
+        return self._drop_orphan(row[0])
+
+    def _drop_orphan(self, digest):
+        # identical pages share a blob, it only goes once no url points at it
+        if self._db.execute('select 1 from pages where digest = ?', (digest,)).fetchone() is not None:
+            return 0
+        row = self._db.execute('select size from blobs where digest = ?', (digest,)).fetchone()
+        self._db.execute('delete from blobs where digest = ?', (digest,))
+        return row[0] if row else 0
+
+    def _evict(self):
+        total = self._db.execute('select coalesce(sum(size), 0) from blobs').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for (url,) in self._db.execute('select url from pages order by accessed').fetchall():
+            total -= self._delete(url)
+            self.evicted += 1
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            entries = self._db.execute('select count(*) from pages').fetchone()[0]
+            size, raw_size = self._db.execute(
+                'select coalesce(sum(size), 0), coalesce(sum(raw_size), 0) from blobs').fetchone()
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'bytes_stored': size,
+            'bytes_raw': raw_size,
+            'bytes_saved': raw_size - size
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CachedResponse():
+    # the parts of an httpx response the scrapers use
+    def __init__(self, url, text, status_code=200):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        pass
+
+
+class CachingClient():
+    def __init__(self, client, cache, delay=0.0, metrics=None):
+        # wraps an httpx client so pages come out of the shared cache when possible.
+        # `delay` is the pause after every request that really went out to the site,
+        # `metrics` (a metrics.Metrics) counts cache hits and http statuses and times both
+        self.client = client
+        self.cache = cache
+        self.delay = delay
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    def get(self, url, max_age=None, final_after=None):
+        with self.metrics.timer('stage_seconds', stage='cache_read'):
+            text = self.cache.get(url, max_age=max_age, final_after=final_after)
+        if text is not None:
+            self.metrics.inc('cache_total', result='hit')
+            return CachedResponse(url, text)
+        self.metrics.inc('cache_total', result='miss')
+        with self.metrics.timer('stage_seconds', stage='fetch'):
+            response = self.client.get(url)
+        self.metrics.inc('http_responses_total', status=response.status_code)
+        response.raise_for_status()
+        self.cache.put(url, response.text)
+        if self.delay:
+            time.sleep(self.delay)
+        return response
+
+
+class AsyncCachingClient():
+    def __init__(self, client, cache, limiter=None, metrics=None):
+        # CachingClient for an httpx.AsyncClient; requests that go out to the site first wait
+        # for a token from `limiter` (e.g. fetch_engine.AsyncTokenBucket)
+        self.client = client
+        self.cache = cache
+        self.limiter = limiter
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    async def get(self, url):
+        with self.metrics.timer('stage_seconds', stage='cache_read'):
+            text = self.cache.get(url)
+        if text is not None:
+            self.metrics.inc('cache_total', result='hit')
+            return CachedResponse(url, text)
+        self.metrics.inc('cache_total', result='miss')
+        if self.limiter is not None:
+            with self.metrics.timer('stage_seconds', stage='rate_wait'):
+                await self.limiter.acquire()
+        # with many requests in flight this is the latency of one, waits included
+        with self.metrics.timer('stage_seconds', stage='fetch'):
+            response = await self.client.get(url)
+        self.metrics.inc('http_responses_total', status=response.status_code)
+        response.raise_for_status()
+        self.cache.put(url, response.text)
+        return response
@@ -1,55 +1,94 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-import pandas as pd
+import argparse
 import re
+from datetime import datetime
+import httpx
+import pandas as pd
+from page_cache import PageCache, CachingClient
+from metrics import Metrics
+from table_extract import table_rows, cell_text, cell_link
+import columnar
+
+base_url = "https://www.basketball-reference.com"
+output_file = "./scraped/player_evaluations.csv"
+metrics_file = "./data/evaluation_metrics.json"
+# a cached totals page is refetched once it is a day old, unless it was fetched after its
+# season was over: that copy can't change anymore and is served from the cache for good
+cache_ttl = 24 * 60 * 60
+# pause after every page that really comes from the site
+request_delay = 3.1
+
+years = [2020, 2021, 2022, 2023, 2024]
+top = 50
+
+headers = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.google.com/",
+}
+
+player_href = re.compile(r'/players/([a-z]/[^/]+)\.html')
+
+
+def season_end(year):
+    # timestamp the season ending in `year` is over by, the finals are done before july
+    return datetime(year, 7, 1).timestamp()
+
 
+def totals_url(year):
+    return f"{base_url}/leagues/NBA_{year}_totals.html"
 
-driver = webdriver.Chrome()
-
-years = ["2020", "2021", "2022", "2023", "2024"]
-
-all_players_info = []
-
-for year in years:
-    totals_url = f"https://www.basketball-reference.com/leagues/NBA_{year}_totals.html"
-    driver.get(totals_url)
-
-    rows = driver.find_elements(
-        By.CSS_SELECTOR, "table.stats_table tbody tr:not(.thead):not(.partial_table)")
-    for row in rows:
-        rank = row.find_element(
-            By.CSS_SELECTOR, "th[data-stat='ranker']").text
-        player = row.find_element(
-            By.CSS_SELECTOR, "td[data-stat='name_display'] a")
-
-        player_href = player.get_attribute("href")
-        x = re.search(
-            r'/players/([a-z]/[^/]+)\.html', player_href)
-        player_id = x.group(1)
-        player_age = row.find_element(
-            By.CSS_SELECTOR, "td[data-stat='age']").text
-        player_team = row.find_element(
-            By.CSS_SELECTOR, "td[data-stat='team_name_abbr']").text
-        player_position = row.find_element(
-            By.CSS_SELECTOR, "td[data-stat='pos']").text
-        points = row.find_element(
-            By.CSS_SELECTOR, "td[data-stat='pts']").text
-
-        players_info = {
-            'player_id': player_id,
-            'won_at_age': player_age,
-            'season': f'{int(year) - 1}-{year}',
+
+def parse_totals(text, year, top=top):
+    # the whole totals table in one pass over the page source. rows come ranked by points,
+    # so reading stops at the first rank past `top`
+    players_info = []
+    for cells in table_rows(text, 'totals_stats', skip_classes=('thead', 'partial_table')):
+        rank = cell_text(cells['ranker'])
+        if int(rank) > top:
+            break
+        player = cell_link(cells.get('name_display'))
+        players_info.append({
+            'player_id': player_href.search(player.get('href')).group(1),
+            'won_at_age': cell_text(cells['age']),
+            'season': f'{year - 1}-{year}',
             'rank': rank,
-            'team': player_team,
-            'player_position': player_position,
-            'points': points
-        }
-        if int(rank) <= 50:
-            all_players_info.append(players_info)
+            'team': cell_text(cells['team_name_abbr']),
+            'player_position': cell_text(cells['pos']),
+            'points': cell_text(cells['pts'])
+        })
+    return players_info
+
+
+def scrape_evaluations(client, years=years, top=top):
+    all_players_info = []
+    for year in years:
+        response = client.get(totals_url(year), max_age=cache_ttl, final_after=season_end(year))
+        response.raise_for_status()
+        with client.metrics.timer('stage_seconds', stage='parse'):
+            all_players_info.extend(parse_totals(response.text, year, top))
+    return all_players_info
+
+
+def main(years=years, top=top, output='csv'):
+    metrics = Metrics()
+    with httpx.Client(headers=headers) as http_client:
+        client = CachingClient(http_client, PageCache(), delay=request_delay, metrics=metrics)
+        all_players_info = scrape_evaluations(client, years, top)
+    player_evaluations_table = pd.DataFrame(all_players_info)
+    with metrics.timer('stage_seconds', stage='save'):
+        if output == 'csv':
+            player_evaluations_table.to_csv(
+                output_file, encoding='utf-8-sig', index=False)
         else:
-            break
+            columnar.write(player_evaluations_table, 'player_evaluations', output_file, output)
+    metrics.dump(metrics_file)
+
 
-driver.quit()
-player_evaluations_table = pd.DataFrame(all_players_info)
-player_evaluations_table.to_csv(
-    "./scraped/player_evaluations.csv", encoding='utf-8-sig', index=False)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--first', type=int, default=years[0], help='first season, by the year it ends in')
+    parser.add_argument('--last', type=int, default=years[-1])
+    parser.add_argument('--top', type=int, default=top)
+    parser.add_argument('--output', choices=['csv', *columnar.extensions], default='csv')
+    args = parser.parse_args()
+    main(list(range(args.first, args.last + 1)), args.top, args.output)
@@ -0,0 +1,107 @@
+import numpy
+import pandas
+import pyarrow as pa
+
+# typed column buffers for scraped rows. numbers and bools are kept unboxed in numpy arrays
+# with a separate null mask, repeated strings (positions, seasons) as int32 codes into a
+# per-column list, and only free text stays as python strings. pandas and arrow get views of
+# the buffers instead of copies
+
+kinds = {
+    'float': numpy.float64,
+    'int': numpy.int64,
+    'bool': numpy.bool_,
+    'category': numpy.int32,
+    'str': object,
+}
+
+
+class ColumnStore():
+    __slots__ = ('columns', 'kinds', '_values', '_mask', '_categories', '_codes', '_size')
+
+    def __init__(self, columns, column_kinds, capacity=1024):
+        self.columns = list(columns)
+        self.kinds = list(column_kinds)
+        self._size = 0
+        self._values = [numpy.empty(capacity, dtype=kinds[kind]) for kind in self.kinds]
+        self._mask = [numpy.zeros(capacity, dtype=numpy.bool_) for _ in self.kinds]
+        # category columns: the values seen so far and their codes
+        self._categories = [[] if kind == 'category' else None for kind in self.kinds]
+        self._codes = [{} if kind == 'category' else None for kind in self.kinds]
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        # new buffers rather than resizing in place, frames handed out earlier keep theirs
+        capacity = len(self._values[0]) * 2
+        for i, values in enumerate(self._values):
+            grown = numpy.empty(capacity, dtype=values.dtype)
+            grown[:self._size] = values[:self._size]
+            self._values[i] = grown
+            mask = numpy.zeros(capacity, dtype=numpy.bool_)
+            mask[:self._size] = self._mask[i][:self._size]
+            self._mask[i] = mask
+
+    def append(self, row):
+        if self._size == len(self._values[0]):
+            self._grow()
+        at = self._size
+        for i, value in enumerate(row):
+            if value is None or value is pandas.NA:
+                self._mask[i][at] = True
+                # a masked float is also NaN, so its plain numpy view reads as missing too
+                self._values[i][at] = numpy.nan if self.kinds[i] == 'float' else (None if self.kinds[i] == 'str' else 0)
+            elif self._codes[i] is not None:
+                code = self._codes[i].get(value)
+                if code is None:
+                    code = self._codes[i][value] = len(self._categories[i])
+                    self._categories[i].append(value)
+                self._values[i][at] = code
+            else:
+                self._values[i][at] = value
+        self._size += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def nbytes(self):
+        # the buffers in use, plus the python strings they point to
+        size = sum(values[:self._size].nbytes + mask[:self._size].nbytes
+                   for values, mask in zip(self._values, self._mask))
+        for kind, values, categories in zip(self.kinds, self._values, self._categories):
+            if kind == 'str':
+                size += sum(len(value) + 49 for value in values[:self._size] if value is not None)
+            elif kind == 'category':
+                size += sum(len(value) + 49 for value in categories)
+        return size
+
+    def _pandas_column(self, i):
+        n = self._size
+        values, mask = self._values[i][:n], self._mask[i][:n]
+        kind = self.kinds[i]
+        if kind == 'float':
+            return values
+        if kind == 'int':
+            return pandas.arrays.IntegerArray(values, mask)
+        if kind == 'bool':
+            return pandas.arrays.BooleanArray(values, mask)
+        if kind == 'category':
+            return pandas.Categorical.from_codes(numpy.where(mask, -1, values), categories=self._categories[i])
+        return values
+
+    def to_pandas(self):
+        return pandas.DataFrame({column: self._pandas_column(i) for i, column in enumerate(self.columns)}, copy=False)
+
+    def _arrow_column(self, i):
+        n = self._size
+        values, mask = self._values[i][:n], self._mask[i][:n]
+        if self.kinds[i] == 'category':
+            return pa.DictionaryArray.from_arrays(pa.array(values, mask=mask), pa.array(self._categories[i], pa.string()))
+        if self.kinds[i] == 'str':
+            return pa.array(values, type=pa.string(), mask=mask)
+        return pa.array(values, mask=mask)
+
+    def to_arrow(self):
+        return pa.table({column: self._arrow_column(i) for i, column in enumerate(self.columns)})
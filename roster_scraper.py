@@ -1,119 +1,327 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+from datetime import date
 import httpx
-from bs4 import BeautifulSoup
 import pandas as pd
-import time
+from page_cache import PageCache, AsyncCachingClient
+from fetch_engine import AsyncTokenBucket
+from metrics import Metrics
+from table_extract import table_rows, cell_text, cell_link
+import columnar
 
 base_url = 'https://www.basketball-reference.com'
 teams_url = f'{base_url}/teams/'
 output_file = "./scraped/roster_data.csv"
+# (team_id, season) pairs already in the output, so a rerun only fetches what is missing
+manifest_file = './data/roster_manifest.json'
+metrics_file = './data/roster_metrics.json'
+start_year = 2015
+# the team index and current season change, so cached pages are refetched after a day
+cache_ttl = 24 * 60 * 60
+# one request every 3.1s at most, however many rosters are being fetched at once
+request_rate = 1 / 3.1
+max_in_flight = 8
+column_order = ['team_name', 'season', 'player_id', 'player_position']
 headers = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept-Language": "en-US,en;q=0.9",
     "Referer": "https://www.google.com/",
 }
 
-def get_teams(client):
-    response = client.get(teams_url)
-    response.raise_for_status()
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.text, 'html.parser')
-        table = soup.find('table', id='teams_active')
-        clickable_rows = table.find_all('tr', class_='full_table')
-        teams = []
-        for row in clickable_rows:
-            row_info = row.find('th', {'data-stat': 'franch_name'}).find('a')
-            teams.append(
+def parse_teams(text):
+    teams = []
+    for cells in table_rows(text, 'teams_active', row_class='full_table'):
+        row_info = cell_link(cells['franch_name'])
+        teams.append(
+            {
+                'id': row_info.get('href').split('/')[2],
+                'name': cell_text(row_info),
+                'href': row_info.get('href')
+            }
+        )
+    return teams
+
+
+def parse_seasons(text, team_id, start_year=2015):
+    seasons = []
+    for cells in table_rows(text, team_id):
+        season_cell = cells['season']
+        season = cell_text(season_cell)
+        if int(season.split('-')[0]) >= start_year:
+            seasons.append(
                 {
-                    'id': row_info['href'].split('/')[2],
-                    'name': row_info.text,
-                    'href': row_info['href']
-                }     
+                    'season': season,
+                    'href': cell_link(season_cell).get('href')
+                }
             )
+    return seasons
+
+
+def parse_roster(text):
+    players = []
+    for cells in table_rows(text, 'roster'):
+        player_info = cell_link(cells['player'])
+        players.append(
+            {
+                'id' : player_info.get('href').split('/players/')[1].replace('.html', ''),
+                'position': cell_text(cells['pos'])
+            }
+        )
+    return players
+
+
+async def get_teams(client):
+    response = await client.get(teams_url)
+    response.raise_for_status()
+    if response.status_code == 200:
+        with client.metrics.timer('stage_seconds', stage='parse'):
+            teams = parse_teams(response.text)
     return teams
 
 
-def get_team_data_based_on_seasons(client, team_href, team_id, start_year=2015):
+async def get_team_data_based_on_seasons(client, team_href, team_id, start_year=2015):
     url = base_url + team_href
-    response = client.get(url)
+    response = await client.get(url)
     response.raise_for_status()
     if response.status_code == 200:
-        soup = BeautifulSoup(response.text, 'html.parser')
-        table = soup.find('table', id=team_id)
-        rows = table.find('tbody').find_all('tr')
-        seasons = []
-        for row in rows:
-            season_cell = row.find('th', {'data-stat': 'season'})
-            season = season_cell.get_text()
-            if int(season.split('-')[0]) >= start_year:
-                seasons.append(
-                    {
-                        'season': season,
-                        'href': season_cell.find('a')['href']
-                    }
-                )        
+        with client.metrics.timer('stage_seconds', stage='parse'):
+            seasons = parse_seasons(response.text, team_id, start_year)
     return seasons
     
-def get_roster(client, season_href):
-    response = client.get(base_url + season_href)
+async def get_roster(client, season_href):
+    response = await client.get(base_url + season_href)
     response.raise_for_status()
     if response.status_code == 200:
-        soup = BeautifulSoup(response.text, 'html.parser')
-        table = soup.find('table', id='roster')
-        rows = table.find('tbody').find_all('tr')
-        players = []
-        for row in rows:
-            player_info = row.find('td', {'data-stat': 'player'}).find('a')
-            players.append(
-                {
-                    'id' : player_info['href'].split('/players/')[1].replace('.html', ''),
-                    'position': row.find('td', {'data-stat':'pos'}).text
-                    
-                }
-            )
+        with client.metrics.timer('stage_seconds', stage='parse'):
+            players = parse_roster(response.text)
     return players
     
     
-def save_to_csv(data, filename):
+def save_to_csv(data, filename, output='csv'):
     df = pd.DataFrame(data)
     df = df.rename(columns={
         'id': 'player_id',
         'position': 'player_position'
     })
-    column_order = ['team_name', 'season', 'player_id', 'player_position']
     df = df[column_order]
     
-    df.to_csv(filename, index=False, encoding='utf-8')
+    if output == 'csv':
+        df.to_csv(filename, index=False, encoding='utf-8')
+    else:
+        filename = columnar.write(df, 'roster_data', filename, output)
     print(f'{filename} successfully saved!')
     
-def main():
-    data = []   
-    with httpx.Client(http2=True, headers=headers) as client:
+def season_label(year):
+    return f'{year}-{(year + 1) % 100:02d}'
+
+
+def current_season(today=None):
+    # next season's team pages go up after the draft, so july is where a new season starts
+    today = today or date.today()
+    return season_label(today.year if today.month >= 7 else today.year - 1)
+
+
+class RosterStore():
+    def __init__(self, filename, manifest_path, current=None):
+        # the csv is the source of truth. the manifest only says which seasons of a team are
+        # done and where their roster lives, so the team page doesn't have to be fetched again.
+        # `current` is the season still going on, the only one whose rosters change
+        self.filename = filename
+        self.manifest_path = manifest_path
+        self.current = current
+        self.rosters = {}
+        self.manifest = {}
+        # (team_name, season) -> byte offsets of the first and the last line of its rows
+        self.offsets = {}
+        self.changed = set()
+        self._end = None
+        self._file = None
+        self._writer = None
+
+    def load(self, teams):
+        if os.path.exists(self.filename):
+            with open(self.filename, mode='rb') as f:
+                data = f.read()
+            fields, offset = None, 0
+            for line in data.splitlines(keepends=True):
+                # a line cut off by a kill is dropped, and overwritten by the next write
+                if not line.endswith(b'\n'):
+                    break
+                values = next(csv.reader([line.decode('utf-8')]))
+                if fields is None:
+                    fields = values
+                else:
+                    row = dict(zip(fields, values))
+                    key = (row['team_name'], row['season'])
+                    self.rosters.setdefault(key, []).append(row)
+                    first = self.offsets.get(key, (offset,))[0]
+                    self.offsets[key] = (first, offset)
+                offset += len(line)
+            self._end = offset
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, mode='r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        # pairs whose rows didn't make it into the csv are not done, whatever the manifest says
+        for team in teams:
+            seasons = manifest.get(team['id'], {})
+            self.manifest[team['id']] = {season: href for season, href in seasons.items()
+                                         if (team['name'], season) in self.rosters}
+
+    def seasons(self, team):
+        return self.manifest[team['id']]
+
+    def add(self, team, season, roster):
+        key = (team['name'], season['season'])
+        rows = [{'team_name': team['name'], 'season': season['season'],
+                 'player_id': player['id'], 'player_position': player['position']} for player in roster]
+        if key not in self.offsets:
+            # new rosters (and ones that had no rows) are appended, the rest of the file is left alone
+            self._append(key, rows)
+        elif rows != self.rosters[key]:
+            self.changed.add(key)
+        self.rosters[key] = rows
+        self.manifest[team['id']][season['season']] = season['href']
+        self._save_manifest()
+
+    def _append(self, key, rows):
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+            header = not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+            self._file = open(self.filename, mode='a', newline='', encoding='utf-8')
+            if self._end is not None:
+                self._file.truncate(self._end)
+            # the same line ending as the pandas-written file
+            self._writer = csv.DictWriter(self._file, fieldnames=column_order, lineterminator='\n')
+            if header:
+                self._writer.writeheader()
+            self._file.flush()
+        offset = self._file.tell()
+        self._writer.writerows(rows)
+        self._file.flush()
+        if rows:
+            self.offsets[key] = (offset, self._file.tell() - 1)
+
+    def _save_manifest(self):
+        # written next to the old one and renamed over it, a kill never leaves half a manifest
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, mode='w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = self._writer = None
+        changed = [key for key in self.changed if key in self.offsets]
+        self.changed = set()
+        if not changed:
+            return
+        # a refreshed roster differs from the one on disk (a trade, a signing). the file is
+        # written again from the first changed or current season roster on, with every roster
+        # that has rows past that point, and the current season's rosters go at the end. the
+        # first time that moves them there, after that a nightly refresh only rewrites the
+        # current season (a few hundred rows) and not the seasons before it
+        current = [key for key in self.offsets if key[1] == self.current]
+        start = min(self.offsets[key][0] for key in changed + current)
+        while True:
+            tail = [key for key in self.rosters if key in self.offsets and self.offsets[key][1] >= start]
+            first = min(self.offsets[key][0] for key in tail)
+            if first == start:
+                break
+            start = first
+        tail.sort(key=lambda key: (key[1] == self.current, self.offsets[key][0]))
+        chunks, offset = [], start
+        for key in tail:
+            text = io.StringIO()
+            csv.DictWriter(text, fieldnames=column_order, lineterminator='\n').writerows(self.rosters[key])
+            chunk = text.getvalue().encode('utf-8')
+            if chunk:
+                self.offsets[key] = (offset, offset + len(chunk) - 1)
+            chunks.append(chunk)
+            offset += len(chunk)
+        # a kill in the middle leaves the rosters after it out of the csv, and they are
+        # fetched again on the next run like any other missing roster
+        with open(self.filename, mode='r+b') as f:
+            f.seek(start)
+            f.write(b''.join(chunks))
+            f.truncate()
+        self._end = offset
+
+
+async def pending_seasons(client, team, store, current):
+    done = store.seasons(team)
+    # every season up to the current one is done, the roster url of the current one is known
+    # and the team page has nothing new to offer
+    expected = [season_label(year) for year in range(start_year, int(current[:4]) + 1)]
+    if all(season in done for season in expected):
+        return [{'season': current, 'href': done[current]}]
+    seasons = await get_team_data_based_on_seasons(client, team['href'], team['id'], start_year)
+    # past rosters never change, only the missing ones and the current one are fetched
+    return [season for season in seasons if season['season'] not in done or season['season'] == current]
+
+
+async def scrape_team(client, team, store, current, slots):
+    async with slots:
+        print(f"Scraping data for team: {team['name']}")
+        seasons = await pending_seasons(client, team, store, current)
+    rosters = [scrape_season(client, team, season, store, slots) for season in seasons]
+    return sum(await asyncio.gather(*rosters))
+
+
+async def scrape_season(client, team, season, store, slots):
+    try:
+        async with slots:
+            roster = await get_roster(client, season['href'])
+    except Exception as e:
+        print(f"An error occurred for {team['name']} {season['season']}: {e}")
+        return 0
+    # rosters are stored as soon as they are in, in whatever order they finish
+    store.add(team, season, roster)
+    return 1
+
+
+async def crawl(filename, manifest_path=manifest_file, metrics=None):
+    # one pooled http/2 connection carries every request; the token bucket, not the code,
+    # decides how fast the crawl goes
+    limits = httpx.Limits(max_connections=1)
+    async with httpx.AsyncClient(http2=True, headers=headers, limits=limits) as http_client:
+        client = AsyncCachingClient(http_client, PageCache(ttl=cache_ttl), AsyncTokenBucket(request_rate), metrics)
+        slots = asyncio.Semaphore(max_in_flight)
+        current = current_season()
+        store = RosterStore(filename, manifest_path, current)
         try:
-            teams = get_teams(client)
-            time.sleep(3.1)
-            
-            for team in teams:
-                print(f'Scraping data for team: {team['name']}')
-                seasons = get_team_data_based_on_seasons(client, team['href'], team['id'])
-                time.sleep(3.1)
-                
-                for season in seasons:
-                    roster = get_roster(client, season['href'])
-                    
-                    for player in roster:
-                        player.update({
-                                'team_name': team['name'],
-                                'season': season['season']
-                            })
-                        data.append(player)
-
-                    time.sleep(3.1)  
-                    
-        except Exception as e:
-            print(f"An error occurred: {e}")
-        
+            teams = await get_teams(client)
+            store.load(teams)
+            results = await asyncio.gather(
+                *[scrape_team(client, team, store, current, slots) for team in teams],
+                return_exceptions=True
+            )
         finally:
-            save_to_csv(data, output_file)
+            with client.metrics.timer('stage_seconds', stage='save'):
+                store.close()
+        for team, result in zip(teams, results):
+            if isinstance(result, Exception):
+                client.metrics.inc('errors_total', stage='team')
+                print(f"An error occurred for {team['name']}: {result}")
+    print(f'{sum(r for r in results if isinstance(r, int))} rosters fetched, {filename} successfully saved!')
+
+
+def main(output='csv'):
+    metrics = Metrics()
+    asyncio.run(crawl(output_file, metrics=metrics))
+    # the crawl itself appends to the csv; a columnar copy is written from it at the end
+    if output != 'csv':
+        with metrics.timer('stage_seconds', stage='save'):
+            save_to_csv(pd.read_csv(output_file).to_dict('records'), output_file, output)
+    metrics.dump(metrics_file)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', choices=['csv', *columnar.extensions], default='csv')
+    main(parser.parse_args().output)
\ No newline at end of file
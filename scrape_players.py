@@ -1,13 +1,24 @@
 import os
-import requests
+import json
 import pandas
-from lxml import html
+from lxml import html, etree
 import datetime
 import re
-from time import sleep
+from time import perf_counter
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from fetch_engine import FetchEngine
+from checkpoint import Checkpoint, JsonLines, to_json
+from page_cache import PageCache
+from record_store import ColumnStore
+from metrics import Metrics
+from table_extract import table_rows, element_rows, cell_text
+import columnar
 
 class PlayerScraper():
-    def __init__(self, verbose=True):
+    def __init__(self, verbose=True, base_url='https://www.basketball-reference.com', cache_dir='./data/players', cache=None, rate=0.25, workers=4,
+                 checkpoint='./data/checkpoint.jsonl', fsync_interval=5.0, profile=False, revalidate=None,
+                 processes=1, metrics_file='./data/player_metrics.json', season_stats=None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:146.0) Gecko/20100101 Firefox/146.0',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -19,20 +30,74 @@ class PlayerScraper():
             'Upgrade-Insecure-Requests': '1',
             'Sec-Fetch-Dest': 'document'
         }
+        self.verbose = verbose
+        self.base_url = base_url
+        # pages go to the compressed pack file shared with the other scrapers. cache_dir is the
+        # old one-file-per-player cache, pages found there are moved into the pack as they are
+        # read (the file is deleted once the pack has it)
+        self.cache = cache if cache is not None else PageCache()
+        self.cache_dir = cache_dir
+        # None: cached pages are used as they are, 'all': every cached page is checked with a
+        # conditional request, 'active': only pages of players that were active when last parsed
+        if revalidate not in (None, 'all', 'active'):
+            raise ValueError(f'bad revalidate mode: {revalidate}')
+        self.revalidate = revalidate
+        # stage timings, cache and http counters, extraction failures. written to metrics_file
+        # (.json, or .prom for prometheus text) at the end of every batch
+        self.metrics = Metrics()
+        self.metrics_file = metrics_file
+        # basketball-reference bans clients that go over ~20 requests a minute
+        self.engine = FetchEngine(self.headers, rate=rate, workers=workers, metrics=self.metrics)
+        # with more than one process, batch_process parses pages on a process pool
+        self.processes = processes
+        self._setup_parser()
+        # rows are buffered in typed column stores and only turned into dataframes when asked
+        # for, concatenating one-row frames per player is quadratic over a batch
+        self._players = ColumnStore(self.columns, self.column_kinds)
+        self._salaries = ColumnStore(self.salary_columns, self.salary_kinds)
+        self._df_players = None
+        self._df_salaries = None
+        # processed players are appended to the checkpoint so a restarted batch can pick up where it stopped
+        self.checkpoint = Checkpoint(checkpoint, fsync_interval) if checkpoint else None
+        self._done = set()
+        # with a path (e.g. './scraped/season_stats.jsonl') batch_process also writes the
+        # per-season lines of every page there, taken from the tree the player row comes from
+        self.season_stats = JsonLines(season_stats) if season_stats else None
+        # print where the time went at the end of a batch
+        self.profile = profile
+        self._check_structure()
+        self.failures = []
+        
+    def _setup_parser(self):
+        # compiled once; apart from 'blocks' they are evaluated against the page block the field lives in
         self.xpaths = {
-            'name':  '//h1',
-            'pos':   '//p[contains(., "Position:")]',
-            'birthday': '//*[@data-birth]',
-            'death': '//*[@data-death]',
-            'age': '//p[span[contains(text(), "Age")]]',
-            'hw': '//p[contains(., "cm,")]',
-            'career': '//p[contains(., "Career Length:")]',
-            'experience': '//p[contains(., "Experience:")]',
-            'hall_of_fame': '//li[@class="important special"]',
-            'all_star': '//li[@class="all_star"]',
-            'stats': '//span/following-sibling::p/following-sibling::p'
+            'blocks': etree.XPath('//div[@id="info" or contains(@class, "stats_pullout")] | //ul[@id="bling"]'),
+            'name': etree.XPath('.//h1'),
+            'birthday': etree.XPath('.//*[@data-birth]'),
+            'death': etree.XPath('.//*[@data-death]'),
+            'hall_of_fame': etree.XPath('.//li[@class="important special"]'),
+            'all_star': etree.XPath('.//li[@class="all_star"]'),
+            'stats': etree.XPath('.//span/following-sibling::p/following-sibling::p'),
+            'comment': etree.XPath('//comment()[contains(., $marker)]')
+        }
+        # per-season tables by kind, under the ids the site has used for them. totals and
+        # advanced usually only come inside html comments
+        self.season_tables = {
+            'per_game': ('per_game_stats', 'per_game'),
+            'totals': ('totals_stats', 'totals'),
+            'advanced': ('advanced',)
+        }
+        self.season_pattern = re.compile(r'\d{4}-\d{2}$')
+        # one match per salary row; only run over the salary table, not the whole page.
+        # fix: some players have invalid values inside their tables (e.g. k/krejcvi01)
+        self.salary_pattern = re.compile(r'<th scope="row" class="left " data-stat="season"\s>(\d{4}-\d{2})</th><td class="left " data-stat="team_name" >[^\n]*data-stat="salary" csk="(\d+)')
+        # bio paragraphs are told apart by what they contain
+        self.paragraph_markers = {
+            'pos': 'Position:',
+            'hw': 'cm,',
+            'career': 'Career Length:',
+            'experience': 'Experience:'
         }
-        self.verbose = verbose
         self.columns = [
             'id',
             'name',
@@ -57,66 +122,183 @@ class PlayerScraper():
             'stat_efficiency_rating',
             'stat_win_shares'
             ]
-        self.df_players = pandas.DataFrame(columns=self.columns)
-        self.df_salaries = pandas.DataFrame(columns=['player_id', 'season', 'salary'])
-        self._check_structure()
-        self.failures = []
-        
+        self.column_kinds = ['str', 'str', 'category', 'category', 'float', 'bool', 'int', 'int', 'int', 'bool',
+                             'bool', 'int'] + ['float'] * 10
+        self.salary_columns = ['player_id', 'season', 'salary']
+        self.salary_kinds = ['str', 'category', 'int']
+
+    @classmethod
+    def parser(cls):
+        # a scraper that can only parse pages: no cache, fetch engine or checkpoint.
+        # this is what the parse workers of batch_process run
+        self = cls.__new__(cls)
+        self.verbose = False
+        self.metrics = Metrics()
+        self._setup_parser()
+        return self
+
+    @property
+    def df_players(self):
+        if self._df_players is None:
+            self._df_players = self._players.to_pandas()
+        return self._df_players
+
+    @property
+    def df_salaries(self):
+        if self._df_salaries is None:
+            self._df_salaries = self._salaries.to_pandas()
+        return self._df_salaries
+
     def _print_msg(self, msg, end='\n'):
         if self.verbose:
             print(msg, end=end)
+
+    def _extract_failed(self, field, msg):
+        self.metrics.inc('extract_failures_total', field=field)
+        print(msg)
     
     def _check_structure(self):
-        # save to file to avoid sending too many requests
-        # set up structure
-        try:
-            os.mkdir('./data')
-            os.mkdir('./data/players')
+        # pages are cached to avoid sending too many requests
+        entries = self.cache.stats()['entries']
+        if entries:
+            self._print_msg(f'cache structure detected - {entries} pages\n')
+        else:
             self._print_msg('cache is set up\n')
-        except FileExistsError:
-            self._print_msg('cache structure detected\n')
 
-    def _fetch_player(self, player_id):
+    def _player_url(self, player_id):
+        return f'{self.base_url}/players/{player_id}.html'
+
+    def _fetch_player(self, player_id, headers=None):
+        url = self._player_url(player_id)
         try:
-            response = requests.get(f'https://www.basketball-reference.com/players/{player_id}.html', headers=self.headers)
-            if response.status_code == 200:
-                return True, response.text
+            response = self.engine.get(url, headers=headers)
+            if response.status_code in (200, 304):
+                return True, response
             else:
                 self._print_msg(f'could not fetch player data - status: {response.status_code}')
-                print(f'https://www.basketball-reference.com/players/{player_id}.html')
+                print(url)
                 return False, None
         except Exception as e:
+            self.metrics.inc('fetch_errors_total', error=type(e).__name__)
             print(f'caught an exception:\n{e}')
-            
+            return False, None
+
+    def _store_page(self, url, response):
+        return self.cache.put(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    def _needs_revalidation(self, url):
+        if self.revalidate == 'all':
+            return True
+        if self.revalidate == 'active':
+            record = self.cache.get_record(url)
+            # never parsed, no way to tell, so check it
+            if record is None:
+                return True
+            return bool(json.loads(record)['player'][self.columns.index('is_active')])
+        return False
+
+    def _revalidate_player(self, player_id, url, data):
+        etag, last_modified = self.cache.validators(url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        status, response = self._fetch_player(player_id, headers)
+        if not status:
+            # keep using the cached copy when the site can't be reached
+            return data, 'cached'
+        if response.status_code == 304:
+            self.cache.touch(url)
+            return data, 'unchanged'
+        # pages cached without validators come back in full, they may still be the same
+        if self._store_page(url, response):
+            return response.text, 'live'
+        return data, 'unchanged'
+
+    # this runs on the fetch engine's worker threads, so it must not touch the dataframes
     def _get_player(self, player_id):
-        fp = f'./data/players/{player_id.replace("/", "-")}'
-        if not os.path.exists(fp):
-            self._print_msg('getting data from site...', end=' ')
-            status, data = self._fetch_player(player_id)
-            if status:
-                if data:
-                    self._print_msg('OK')
-                    with open(fp, mode='w', encoding='utf-8') as f:
-                        f.write(data)
-                    return data, 'live'
-            else:
-                self.failures.append(player_id)
-                return None, 'error'
+        url = self._player_url(player_id)
+        with self.metrics.timer('stage_seconds', stage='cache_read'):
+            data = self.cache.get(url)
+        if data is not None:
+            self.metrics.inc('cache_total', result='hit')
+            if self._needs_revalidation(url):
+                return self._revalidate_player(player_id, url, data)
+            return data, 'cached'
+        # past the cache's ttl, but its validators can still spare downloading it again
+        data = self.cache.get(url, stale=True)
+        if data is not None:
+            self.metrics.inc('cache_total', result='stale')
+            return self._revalidate_player(player_id, url, data)
+        fp = os.path.join(self.cache_dir, player_id.replace('/', '-'))
+        if os.path.exists(fp):
+            self.metrics.inc('cache_total', result='file')
+            with self.metrics.timer('stage_seconds', stage='cache_read'):
+                with open(fp, mode='r', encoding='utf-8') as f:
+                    data = f.read()
+                self.cache.put(url, data)
+            os.remove(fp)
+            return data, 'cached'
+        self.metrics.inc('cache_total', result='miss')
+        status, response = self._fetch_player(player_id)
+        if status and response.status_code == 200 and response.text:
+            self._store_page(url, response)
+            return response.text, 'live'
         else:
-            with open(fp, mode='r', encoding='utf-8') as f:
-                self._print_msg('reading data from cache')
-                data = f.read()
-                return data, 'cached'
+            self.failures.append(player_id)
+            return None, 'error'
+
+    def _timed(self, stage, fn, *args):
+        start = perf_counter()
+        result = fn(*args)
+        self.metrics.observe('stage_seconds', perf_counter() - start, stage=stage)
+        return result
+
+    def timing_report(self):
+        timings = self.metrics.totals('stage_seconds', 'stage')
+        if not timings:
+            return 'no timings collected yet'
+        total = sum(timings.values())
+        lines = [f'{"stage":<14}{"seconds":>10}{"share":>8}']
+        for field, seconds in sorted(timings.items(), key=lambda x: x[1], reverse=True):
+            lines.append(f'{field:<14}{seconds:>10.3f}{seconds / total:>8.1%}')
+        lines.append(f'{"total":<14}{total:>10.3f}')
+        return '\n'.join(lines)
+
+    def _page_blocks(self, tree):
+        # bio (#info), awards (#bling) and the career summary (.stats_pullout), found in a single walk.
+        # a block that is missing falls back to the whole page, like the old document-wide xpaths
+        blocks = {'info': tree, 'bling': tree, 'stats': tree}
+        for block in reversed(self.xpaths['blocks'](tree)):
+            if block.get('id') == 'info':
+                blocks['info'] = block
+            elif block.get('id') == 'bling':
+                blocks['bling'] = block
+            else:
+                blocks['stats'] = block
+        return blocks
+
+    def _scan_paragraphs(self, scope):
+        # a single walk over the <p> tags replaces one contains(., ...) scan per field.
+        # like those xpaths, only the first matching paragraph is kept for each field
+        found = {field: [] for field in self.paragraph_markers}
+        for p in scope.iter('p'):
+            text = p.text_content()
+            for field, marker in self.paragraph_markers.items():
+                if not found[field] and marker in text:
+                    found[field].append(p)
+        return found
 
     def _process_player_name(self, tree):
         try:
-            return tree.xpath(self.xpaths['name'])[0].text_content().strip()
+            return self.xpaths['name'](tree)[0].text_content().strip()
         except Exception as e:
-            print(f'could not retrieve player name - error : {e}')
+            self._extract_failed('name', f'could not retrieve player name - error : {e}')
 
-    def _process_player_pos_shoots(self, tree):
+    def _process_player_pos_shoots(self, paragraphs):
         try:
-            p = tree.xpath(self.xpaths['pos'])[0].text_content().split('▪')
+            p = paragraphs['pos'][0].text_content().split('▪')
             pos = p[0].strip().splitlines()[-1].strip()
             shoots = p[1].strip().splitlines()[-1].strip()
             return pos, shoots
@@ -125,12 +307,12 @@ class PlayerScraper():
             print('no pos/shoots')
             return pandas.NA, pandas.NA
         except Exception as e:
-            print(f'could not retrieve player position, shoots - error : {e}')
+            self._extract_failed('pos_shoots', f'could not retrieve player position, shoots - error : {e}')
 
     def _process_player_age(self, tree):  
         try:
-            birthday = tree.xpath(self.xpaths['birthday'])[0].get('data-birth')
-            death = tree.xpath(self.xpaths['death'])
+            birthday = self.xpaths['birthday'](tree)[0].get('data-birth')
+            death = self.xpaths['death'](tree)
             birthday = datetime.datetime.strptime(birthday, '%Y-%m-%d').date()
             if death:
                 death = datetime.datetime.strptime(death[0].get('data-death'), '%Y-%m-%d').date()
@@ -138,47 +320,47 @@ class PlayerScraper():
             else:
                 return (datetime.datetime.today().date() - birthday).days / 365, True
         except Exception as e:
-            print(f'could not retrieve player age - error : {e}')
+            self._extract_failed('age', f'could not retrieve player age - error : {e}')
 
-    def _process_player_height_weight(self, tree):
+    def _process_player_height_weight(self, paragraphs):
         try:
-            parts = tree.xpath(self.xpaths['hw'])[0].text_content().strip().split('(')[-1].split(',')
+            parts = paragraphs['hw'][0].text_content().strip().split('(')[-1].split(',')
             height = int(parts[0].strip().replace('cm', ''))
             weight = int(parts[1].strip().replace('kg)', ''))
             return height, weight
         except Exception as e:
-            print(f'could not retrieve player height, weight - error : {e}')
+            self._extract_failed('height_weight', f'could not retrieve player height, weight - error : {e}')
 
-    def _process_player_career(self, tree):
+    def _process_player_career(self, paragraphs):
         try:
-            career = tree.xpath(self.xpaths['career'])
+            career = paragraphs['career']
             if career:
-                return int(tree.xpath(self.xpaths['career'])[0].text_content().replace('Career Length:', '').replace('year', '').replace('s', '').strip()), False
+                return int(career[0].text_content().replace('Career Length:', '').replace('year', '').replace('s', '').strip()), False
             else:
                 try:
-                    e = int(tree.xpath(self.xpaths['experience'])[0].text_content().replace('Experience:', '').replace('year', '').replace('s', '').strip()), True
+                    e = int(paragraphs['experience'][0].text_content().replace('Experience:', '').replace('year', '').replace('s', '').strip()), True
                     return e
                 except Exception:
                     # rookie player (e.g. n/newelas01)
                     return 0, True
         except Exception as e:
-            print(f'could not retrieve player career/experience - error : {e}')
+            self._extract_failed('career', f'could not retrieve player career/experience - error : {e}')
 
     def _process_player_hall_of_fame(self, tree):
         try:
-            return True if tree.xpath(self.xpaths['hall_of_fame']) else False
+            return True if self.xpaths['hall_of_fame'](tree) else False
         except Exception as e:
-            print(f'could not check hall of fame status - error : {e}')
+            self._extract_failed('hall_of_fame', f'could not check hall of fame status - error : {e}')
     
     def _process_player_all_star(self, tree):
         try:
-            s = tree.xpath(self.xpaths['all_star'])
+            s = self.xpaths['all_star'](tree)
             if s:
                 return int(s[0].text_content().split('x')[0].strip())
             else:
                 return 0
         except Exception as e:
-            print(f'could not check all star count - error : {e}')
+            self._extract_failed('all_star', f'could not check all star count - error : {e}')
     
     def _process_player_stats(self, tree):
         def safe_convert(what):
@@ -188,7 +370,7 @@ class PlayerScraper():
                 return pandas.NA
             
         try:
-            s = tree.xpath(self.xpaths['stats'])
+            s = self.xpaths['stats'](tree)
             # some players don't have any stats (e.g. d/djurini01)
             if s:
                 if len(s) == 11:
@@ -232,85 +414,250 @@ class PlayerScraper():
                         win_shares = pandas.NA
                     )
         except Exception as e:
-            print(f'could not retrieve player stats - error : {e}')
+            self._extract_failed('stats', f'could not retrieve player stats - error : {e}')
+
+    def _salary_pairs(self, data):
+        # the salary table is commented out in the page, so it is cut out of the raw html
+        # instead of the parsed tree. it sits near the bottom, hence the search from the end
+        start = data.rfind('id="all_salaries"')
+        if start == -1:
+            return []
+        end = data.find('</table>', start)
+        return self.salary_pattern.findall(data, start, end if end != -1 else len(data))
+
+    def _stat_value(self, text):
+        text = text.strip()
+        if not text:
+            return None
+        for kind in (int, float):
+            try:
+                return kind(text)
+            except ValueError:
+                pass
+        return text
+
+    def _season_table_rows(self, tree, table_ids):
+        for table_id in table_ids:
+            table = tree.get_element_by_id(table_id, None)
+            if table is not None:
+                return element_rows(table, skip_classes=('thead',))
+            # a commented out table: only the comment is parsed, not the page again
+            comments = self.xpaths['comment'](tree, marker=f'id="{table_id}"')
+            if comments:
+                return table_rows(comments[0].text, table_id, skip_classes=('thead',))
+        return iter(())
+
+    def _season_rows(self, player_id, tree, tables=None):
+        for kind in tables or self.season_tables:
+            for cells in self._season_table_rows(tree, self.season_tables[kind]):
+                season_cell = cells.pop('year_id', None)
+                if season_cell is None:
+                    season_cell = cells.pop('season', None)
+                season = cell_text(season_cell).strip() if season_cell is not None else ''
+                # the career and per-team summaries in the footer are not seasons
+                if not self.season_pattern.match(season):
+                    continue
+                row = {'player_id': player_id, 'table': kind, 'season': season}
+                for stat, cell in cells.items():
+                    row[stat] = self._stat_value(cell_text(cell))
+                yield row
+
+    def iter_season_stats(self, player_ids, tables=None):
+        # typed season lines of the per_game/totals/advanced tables (or just `tables`), player by
+        # player, through the same fetch and single parse per page as batch_process with
+        # season_stats set. the player rows are not kept
+        player_ids = [player_id.strip() for player_id in player_ids]
+        pages = self.engine.map(self._get_player, player_ids)
+        for _, _, _, _, season_rows, _ in self._parsed_pages(player_ids, pages, seasons=True):
+            for row in season_rows or ():
+                if tables is None or row['table'] in tables:
+                    yield row
+
+    def save_season_stats(self, player_ids, output='./scraped/season_stats.jsonl', tables=None):
+        # one json line per season line, written as they come
+        count = 0
+        sink = JsonLines(output)
+        sink.open()
+        try:
+            for row in self.iter_season_stats(player_ids, tables):
+                sink.write([row])
+                count += 1
+        finally:
+            sink.close()
+        self._print_msg(f'{count} season lines saved to {output}')
+        return count
 
     def _process_player_salaries(self, player_id, data):
         try:
-            # fix: some players have invalid values inside their tables (e.g. k/krejcvi01)
-            pattern = r'<th scope="row" class="left " data-stat="season"\s\>(\d{4}-\d{2})<\/th><td class="left " data-stat="team_name" >.*data-stat="salary" csk="(\d+)'
-            pairs = re.findall(pattern, data)
             # some players do not have salary logs (e.g. d/djurini01)
-            if pairs:
-                seasons = []
-                salaries = []
-                for pair in pairs:
-                    season, salary = pair
-                    seasons.append(season)
-                    salaries.append(salary)
-                
-                df = pandas.DataFrame({'player_id': [player_id] * len(seasons), 'season': seasons, 'salary': salaries})
-                
-                if len(self.df_salaries) == 0:
-                    self.df_salaries = df
-                else:
-                    self.df_salaries = pandas.concat([self.df_salaries, df], ignore_index=True)
-            
+            return [(player_id, season, salary) for season, salary in self._salary_pairs(data)]
         except Exception as e:
-            print(f'could not retrieve player salaries - error : {e}')
+            self._extract_failed('salaries', f'could not retrieve player salaries - error : {e}')
+            return []
     
     def process_player(self, player_id):
         self._print_msg(f'processing player {player_id} ...')
         data, source = self._get_player(player_id)
         if source != 'error':
-            html_tree = html.fromstring(data)
-            # getting the data
-            name = self._process_player_name(html_tree)
-            pos, shoots = self._process_player_pos_shoots(html_tree)
-            age, is_alive = self._process_player_age(html_tree)
-            height, weight = self._process_player_height_weight(html_tree)
-            career, is_active = self._process_player_career(html_tree)
-            hall_of_fame = self._process_player_hall_of_fame(html_tree)
-            all_star = self._process_player_all_star(html_tree)
-            stats = self._process_player_stats(html_tree)
-            # process salaries
-            self._process_player_salaries(player_id, data)
-            # df data
-            data=[
-                player_id,
-                name,
-                pos,
-                shoots,
-                age,
-                is_alive,
-                height,
-                weight,
-                career,
-                is_active,
-                hall_of_fame,
-                all_star,
-                *stats.values()]
-            
-            # new player info
-            player = pandas.DataFrame([data], columns=self.columns)
-            # append data
-            if len(self.df_players):
-                self.df_players = pandas.concat([self.df_players, player], ignore_index=True)
-            else:
-                self.df_players = player
-            
+            self._process_page(player_id, data)
         return source
+
+    def _process_page(self, player_id, data):
+        player, salaries, _ = self._parse_page(player_id, data)
+        self._add_record({'id': player_id, 'player': player, 'salaries': salaries})
+
+    def _parse_page(self, player_id, data, seasons=False):
+        # the players row and salary rows, and with seasons=True the season lines of the same tree
+        html_tree = self._timed('parse', html.fromstring, data)
+        # the extractors only look at the block their field lives in
+        blocks = self._timed('blocks', self._page_blocks, html_tree)
+        paragraphs = self._timed('paragraphs', self._scan_paragraphs, blocks['info'])
+        # getting the data
+        name = self._timed('name', self._process_player_name, blocks['info'])
+        pos, shoots = self._timed('pos_shoots', self._process_player_pos_shoots, paragraphs)
+        age, is_alive = self._timed('age', self._process_player_age, blocks['info'])
+        height, weight = self._timed('height_weight', self._process_player_height_weight, paragraphs)
+        career, is_active = self._timed('career', self._process_player_career, paragraphs)
+        hall_of_fame = self._timed('hall_of_fame', self._process_player_hall_of_fame, blocks['bling'])
+        all_star = self._timed('all_star', self._process_player_all_star, blocks['bling'])
+        stats = self._timed('stats', self._process_player_stats, blocks['stats'])
+        # process salaries
+        salaries = self._timed('salaries', self._process_player_salaries, player_id, data)
+        # df data
+        data=[
+            player_id,
+            name,
+            pos,
+            shoots,
+            age,
+            is_alive,
+            height,
+            weight,
+            career,
+            is_active,
+            hall_of_fame,
+            all_star,
+            *stats.values()]
+        season_rows = None
+        if seasons:
+            season_rows = self._timed('seasons', lambda: list(self._season_rows(player_id, html_tree)))
+        return data, salaries, season_rows
     
+    def _add_record(self, record):
+        self._players.append(record['player'])
+        self._salaries.extend(record['salaries'])
+        self._df_players = None
+        self._df_salaries = None
+        self._done.add(record['id'])
+
+    def _resume(self):
+        records = self.checkpoint.load()
+        resumed = 0
+        for record in records:
+            if record['id'] not in self._done:
+                self._add_record(record)
+                resumed += 1
+        if resumed:
+            self._print_msg(f'resumed {resumed} players from checkpoint {self.checkpoint.path}')
+        return resumed
+
+    def _stored_rows(self, player_id, source, seasons=False):
+        # the page did not change since it was last parsed, so neither did its rows. a record
+        # stored without season lines can't stand in for a parse that wants them
+        if source != 'unchanged':
+            return None
+        record = self.cache.get_record(self._player_url(player_id))
+        if record is None:
+            return None
+        record = json.loads(record)
+        if seasons and 'seasons' not in record:
+            return None
+        return record['player'], record['salaries'], record.get('seasons') if seasons else None
+
+    def _parsed_pages(self, players, pages, seasons=False):
+        # yields (player_id, source, player row, salary rows, season lines, parsed) in input
+        # order. the rows are None for pages that could not be fetched, the season lines unless
+        # `seasons` is set
+        if self.processes > 1:
+            yield from self._parsed_pages_on_pool(players, pages, seasons)
+            return
+        for player, (data, source) in zip(players, pages):
+            if source == 'error':
+                yield player, source, None, None, None, False
+                continue
+            rows = self._stored_rows(player, source, seasons)
+            if rows is not None:
+                yield player, source, *rows, False
+            else:
+                yield player, source, *self._parse_page(player, data, seasons), True
+
+    def _parsed_pages_on_pool(self, players, pages, seasons=False):
+        # the parse workers get (player_id, html) and send back plain row tuples. a small window of
+        # pages is in flight, and results are collected in submission order to keep the input order
+        def collect(player, source, result):
+            if isinstance(result, Future):
+                player_row, salary_rows, season_rows, metrics = result.result()
+                self.metrics.merge(metrics)
+                return player, source, player_row, salary_rows, season_rows, True
+            if result is None:
+                return player, source, None, None, None, False
+            return player, source, *result, False
+
+        window = self.processes * 4
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_parse_worker) as pool:
+            pending = deque()
+            for player, (data, source) in zip(players, pages):
+                rows = self._stored_rows(player, source, seasons) if source != 'error' else None
+                if source == 'error' or rows is not None:
+                    pending.append((player, source, rows))
+                else:
+                    pending.append((player, source, pool.submit(_parse_in_worker, player, data, seasons)))
+                if len(pending) >= window:
+                    yield collect(*pending.popleft())
+            while pending:
+                yield collect(*pending.popleft())
+
     def batch_process(self, players, show=False):
-        n = 1
+        resumed = self._resume() if self.checkpoint else 0
+        seasons = self.season_stats is not None
+        if seasons:
+            # a resumed batch already wrote the season lines of the players in the checkpoint
+            self.season_stats.open(append=resumed > 0)
+        players = [player.strip() for player in players]
+        players = [player for player in players if player not in self._done]
         s = len(players)
-        for player in players:
-            self._print_msg(f'[{n}/{s}] | ', end='')
-            source = self.process_player(player.strip())
-            n += 1
-            if source == 'live':
-                self.save()
-                sleep(5)
-        self.save()
+        # pages are read/downloaded on the engine's workers while they are parsed in order
+        pages = self.engine.map(self._get_player, players)
+        parsed_pages = self._parsed_pages(players, pages, seasons)
+        for n, (player, source, player_row, salary_rows, season_rows, parsed) in enumerate(parsed_pages, start=1):
+            self._print_msg(f'[{n}/{s}] | processing player {player} ... {source}')
+            self.metrics.inc('pages_total', source=source)
+            if player_row is None:
+                continue
+            self.metrics.inc('rows_total', origin='parsed' if parsed else 'stored')
+            self._add_record({'id': player, 'player': player_row, 'salaries': salary_rows})
+            if parsed:
+                self.cache.put_record(self._player_url(player), to_json(player, player_row, salary_rows, season_rows))
+            if seasons:
+                # written before the checkpoint line: a player cut off in between is parsed and
+                # written again, and the db load keeps the last copy of a line
+                with self.metrics.timer('stage_seconds', stage='season_stats'):
+                    self.season_stats.write(season_rows)
+            if self.checkpoint:
+                with self.metrics.timer('stage_seconds', stage='checkpoint'):
+                    self.checkpoint.append(player, player_row, salary_rows)
+        # compact the checkpoint into the final files
+        with self.metrics.timer('stage_seconds', stage='save'):
+            self.save()
+        if self.checkpoint:
+            self.checkpoint.clear()
+        if seasons:
+            self.season_stats.close()
+        self._print_msg(f'page cache: {self.cache.stats()}')
+        if self.profile:
+            self._print_msg(self.timing_report())
+        if self.metrics_file:
+            self._print_msg(f'metrics written to {self.metrics.dump(self.metrics_file)}')
         if show:
             print(self.df_players)
             print(self.df_salaries)
@@ -330,6 +677,9 @@ class PlayerScraper():
         elif output == 'excel':
             self.df_players.to_excel('./scraped/players.xlsx')
             self.df_salaries.to_excel('./scraped/salaries.xlsx')
+        elif output in columnar.extensions:
+            columnar.write(self._players.to_arrow(), 'players', './scraped/players.csv', output)
+            columnar.write(self._salaries.to_arrow(), 'salaries', './scraped/salaries.csv', output)
         else:
             print('bad output type')
     
@@ -340,8 +690,23 @@ class PlayerScraper():
         return self.df_salaries
 
 
-scraper = PlayerScraper()
-scraper.batch_process_from_file('./player_id_list.txt')
+# parse workers of PlayerScraper.batch_process, one parser per process
+_worker_parser = None
+
+
+def _init_parse_worker():
+    global _worker_parser
+    _worker_parser = PlayerScraper.parser()
+
+
+def _parse_in_worker(player_id, data, seasons=False):
+    player, salaries, season_rows = _worker_parser._parse_page(player_id, data, seasons)
+    return tuple(player), salaries, season_rows, _worker_parser.metrics.drain()
+
+
+if __name__ == '__main__':
+    scraper = PlayerScraper()
+    scraper.batch_process_from_file('./player_id_list.txt')
 
 # players = [
 #     'b/bryanko01',
@@ -0,0 +1,61 @@
+import io
+from lxml import etree
+
+# pulls the rows of one <table id=...> out of a page without building a tree for the rest of it.
+# basketball-reference pages are mostly navigation, ads and other tables, so only the slice
+# between the target table's tags is handed to lxml, and it is parsed one row at a time
+
+
+def table_html(text, table_id):
+    # the markup of the table, also when the site ships it inside an html comment
+    marker = f'id="{table_id}"'
+    at = text.find(marker)
+    while at != -1:
+        start = text.rfind('<', 0, at)
+        if text.startswith('<table', start):
+            end = text.find('</table>', at)
+            if end == -1:
+                return None
+            return text[start:end + len('</table>')]
+        at = text.find(marker, at + len(marker))
+    return None
+
+
+def table_rows(text, table_id, row_class=None, skip_classes=()):
+    # yields every row outside <thead> as {data-stat: cell element}, only rows with `row_class`
+    # if given and none with a class in `skip_classes`. a row is cleared as soon as the caller
+    # moves on to the next one, so take what is needed from its cells right away
+    fragment = table_html(text, table_id)
+    if fragment is None:
+        raise ValueError(f'no table with id "{table_id}"')
+    events = etree.iterparse(io.BytesIO(fragment.encode('utf-8')), events=('end',), tag='tr',
+                             html=True, encoding='utf-8')
+    for _, row in events:
+        parent = row.getparent()
+        classes = (row.get('class') or '').split()
+        if (parent.tag != 'thead' and (row_class is None or row_class in classes)
+                and not any(name in classes for name in skip_classes)):
+            yield {cell.get('data-stat'): cell for cell in row if cell.get('data-stat') is not None}
+        row.clear()
+        while row.getprevious() is not None:
+            del parent[0]
+
+
+def element_rows(table, skip_classes=()):
+    # the rows table_rows would yield, from a table that is already part of a parsed tree
+    for row in table.iter('tr'):
+        classes = (row.get('class') or '').split()
+        if row.getparent().tag == 'thead' or any(name in classes for name in skip_classes):
+            continue
+        yield {cell.get('data-stat'): cell for cell in row if cell.get('data-stat') is not None}
+
+
+def cell_text(cell):
+    # most cells hold a bare value, only walk the children when there are some
+    if len(cell) == 0:
+        return cell.text or ''
+    return ''.join(cell.itertext())
+
+
+def cell_link(cell):
+    return cell.find('.//a') if cell is not None else None